@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+
+class DatabaseConfig(AppConfig):
+    name = 'backend.database'
+    label = 'database'
+    verbose_name = 'Соединения с БД'
+
+    def ready(self):
+        from .utils import close_unusable_connections
+
+        if settings.DB_HEALTH_CHECKS:
+            request_started.connect(
+                close_unusable_connections, dispatch_uid='db_health_checks'
+            )
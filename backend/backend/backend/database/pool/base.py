@@ -0,0 +1,144 @@
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+from django.conf import settings
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, pool
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool, который ждёт свободное соединение.
+
+    Стандартный пул сразу бросает PoolError, когда соединения кончились;
+    здесь поток ждёт до timeout секунд. Кроме того, стандартный пул
+    хранит только minconn свободных соединений и закрывает остальные при
+    возврате; здесь в пуле остаются все соединения до maxconn, а minconn
+    задаёт лишь число соединений, открываемых заранее.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        self.semaphore = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        self.pid = os.getpid()
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self.semaphore.acquire(timeout=self.timeout):
+            raise pool.PoolError('Нет свободных соединений с БД')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.semaphore.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.semaphore.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        if self.closed:
+            raise pool.PoolError('connection pool is closed')
+        if key is None:
+            key = self._rused.get(id(conn))
+            if key is None:
+                raise pool.PoolError('trying to put unkeyed connection')
+        # Больше maxconn соединений не бывает: их ограничивает semaphore.
+        status = None if conn.closed else conn.info.transaction_status
+        if close or status in (None, extensions.TRANSACTION_STATUS_UNKNOWN):
+            conn.close()
+        else:
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._pool.append(conn)
+        if not self.closed or key in self._used:
+            del self._used[key]
+            del self._rused[id(conn)]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Django берёт соединение из пула вместо connect() и возвращает его
+    туда вместо close(), поэтому CONN_MAX_AGE должен быть 0: соединение
+    отдаётся в пул в конце каждого запроса. Размер пула задаётся ключом
+    POOL в настройках базы.
+
+    Пулы принадлежат процессу: после fork (preload_app в gunicorn) воркер
+    создаёт свои, а унаследованные соединения не использует и не
+    закрывает - close() отправил бы Terminate по сокету, общему с
+    родителем, и оборвал бы его сессию. Сборщик мусора их тоже не
+    закроет: psycopg2 закрывает соединение только в создавшем процессе.
+    """
+    pools = {}
+    pools_lock = threading.Lock()
+
+    @classmethod
+    def forget_pools(cls):
+        cls.pools = {}
+        cls.pools_lock = threading.Lock()
+
+    def get_pool(self, conn_params):
+        # Соединение без имени БД (_nodb_cursor) и тестовая база получают
+        # отдельные пулы.
+        key = (self.alias, repr(sorted(conn_params.items())))
+        with self.pools_lock:
+            if key not in self.pools:
+                options = self.settings_dict.get('POOL', {})
+                self.pools[key] = BlockingConnectionPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    options.get('TIMEOUT', 10),
+                    **conn_params
+                )
+            return self.pools[key]
+
+    def get_new_connection(self, conn_params):
+        connection_pool = self.get_pool(conn_params)
+        connection = connection_pool.getconn()
+        if settings.DB_HEALTH_CHECKS and not self.is_pooled_usable(connection):
+            connection_pool.putconn(connection, close=True)
+            connection = connection_pool.getconn()
+        self.connection_pool = connection_pool
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    @staticmethod
+    def is_pooled_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.connection_pool.pid != os.getpid():
+            # Соединение родительского процесса (close_all в post_fork).
+            return
+        with self.wrap_database_errors:
+            broken = bool(self.connection.closed)
+            if not broken and (
+                self.connection.info.transaction_status
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                self.connection.rollback()
+            self.connection_pool.putconn(self.connection, close=broken)
+
+
+os.register_at_fork(after_in_child=DatabaseWrapper.forget_pools)
@@ -0,0 +1,164 @@
+import os
+import threading
+from unittest import mock, skipUnless
+
+from django.db import connection, connections
+from django.test import SimpleTestCase, TransactionTestCase
+from psycopg2 import extensions, pool
+
+from backend.database.pool.base import BlockingConnectionPool
+
+USES_POOL = connection.settings_dict['ENGINE'] == 'backend.database.pool'
+
+
+@skipUnless(USES_POOL, 'нужен PostgreSQL и DB_POOL=true')
+class ConnectionPoolTests(TransactionTestCase):
+    """Пул соединений на настоящем PostgreSQL."""
+
+    def backend_pid(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_returns_to_pool(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        connection_pool = connection.connection_pool
+        self.assertIn(raw, connection_pool._used.values())
+        connection.close()
+        self.assertIn(raw, connection_pool._pool)
+        self.assertNotIn(raw, connection_pool._used.values())
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+
+    def test_open_transaction_rolled_back_on_return(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        raw.autocommit = False
+        with raw.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.close()
+        self.assertEqual(
+            raw.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE
+        )
+        self.assertEqual(self.backend_pid(), raw.info.backend_pid)
+        self.assertTrue(connection.get_autocommit())
+
+    def test_broken_connection_replaced(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        raw.close()
+        connection.close()
+        self.backend_pid()
+        self.assertIsNot(connection.connection, raw)
+
+    def test_all_returned_connections_reused(self):
+        connections_count = 4
+        blocking = BlockingConnectionPool(
+            1, connections_count, 1, **connection.get_connection_params()
+        )
+        try:
+            first = [blocking.getconn() for _ in range(connections_count)]
+            backends = {raw.info.backend_pid for raw in first}
+            for raw in first:
+                blocking.putconn(raw)
+            self.assertEqual(len(blocking._pool), connections_count)
+            second = [blocking.getconn() for _ in range(connections_count)]
+            self.assertEqual(
+                {id(raw) for raw in second}, {id(raw) for raw in first}
+            )
+            self.assertEqual(
+                {raw.info.backend_pid for raw in second}, backends
+            )
+            self.assertFalse(any(raw.closed for raw in second))
+        finally:
+            blocking.closeall()
+
+    def test_pool_waits_for_free_connection(self):
+        blocking = BlockingConnectionPool(
+            0, 1, 0.1, **connection.get_connection_params()
+        )
+        try:
+            first = blocking.getconn()
+            with self.assertRaises(pool.PoolError):
+                blocking.getconn()
+            blocking.timeout = 5
+            threading.Timer(0.1, blocking.putconn, [first]).start()
+            self.assertIs(blocking.getconn(), first)
+        finally:
+            blocking.closeall()
+
+    @skipUnless(hasattr(os, 'fork'), 'нужен os.fork')
+    def test_fork_does_not_share_connections(self):
+        """Как воркер gunicorn с preload_app: post_fork закрывает
+        унаследованные соединения, воркер открывает свои, а сессия
+        родителя остаётся рабочей."""
+        parent_backend = self.backend_pid()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read)
+                connections.close_all()
+                os.write(write, str(self.backend_pid()).encode())
+                connection.close()
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write)
+        with os.fdopen(read) as output:
+            child_backend = int(output.read() or 0)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertNotIn(child_backend, (0, parent_backend))
+        self.assertEqual(self.backend_pid(), parent_backend)
+
+
+class FakeConnection:
+    """Соединение psycopg2 без сервера: пулу нужны только эти атрибуты."""
+
+    def __init__(self, *args, **kwargs):
+        self.closed = 0
+        self.info = mock.Mock(
+            transaction_status=extensions.TRANSACTION_STATUS_IDLE
+        )
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+@mock.patch('psycopg2.connect', FakeConnection)
+class BlockingConnectionPoolTests(SimpleTestCase):
+    """Возврат соединений в пул без PostgreSQL."""
+
+    def test_keeps_up_to_maxconn_idle_connections(self):
+        blocking = BlockingConnectionPool(1, 4, 1)
+        first = [blocking.getconn() for _ in range(4)]
+        for raw in first:
+            blocking.putconn(raw)
+        second = [blocking.getconn() for _ in range(4)]
+        self.assertEqual(
+            {id(raw) for raw in second}, {id(raw) for raw in first}
+        )
+        self.assertFalse(any(raw.closed for raw in first))
+
+    def test_broken_and_closed_connections_dropped(self):
+        blocking = BlockingConnectionPool(0, 3, 1)
+        idle, broken, busy = [blocking.getconn() for _ in range(3)]
+        broken.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+        busy.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        blocking.putconn(idle)
+        blocking.putconn(broken)
+        blocking.putconn(busy)
+        self.assertTrue(broken.closed)
+        self.assertEqual(blocking._pool, [idle, busy])
+        self.assertEqual(
+            busy.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE
+        )
+        blocking.putconn(blocking.getconn(), close=True)
+        self.assertTrue(busy.closed)
+        self.assertEqual(blocking._pool, [idle])
@@ -0,0 +1,13 @@
+from django.db import connections
+
+
+def close_unusable_connections(**kwargs):
+    """Проверка постоянных соединений в начале запроса.
+
+    Соединение, оставшееся от прошлого запроса (CONN_MAX_AGE > 0),
+    проверяется запросом SELECT 1 и закрывается, если БД его разорвала;
+    тогда запрос откроет новое вместо ошибки на первом обращении.
+    """
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -25,8 +25,10 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'django_filters',
     'djoser',
+    'backend.database',
     'technol_parts_apps',
     'users',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
@@ -39,6 +41,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Замеры запросов к БД и времени ответа по endpoint'ам (Server-Timing и
+# manage.py instrumentation_report). По умолчанию выключены.
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', '').lower() == 'true'
+
+INSTRUMENTATION_DIR = os.getenv(
+    'INSTRUMENTATION_DIR', BASE_DIR / 'instrumentation'
+)
+
+if INSTRUMENTATION:
+    MIDDLEWARE.insert(
+        0, 'technol_parts_apps.instrumentation.InstrumentationMiddleware'
+    )
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -73,12 +88,54 @@ DATABASES = {
     'default': {
         # Меняем настройку Django: теперь для работы будет использоваться
         # бэкенд postgresql
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения: сколько секунд соединение живёт между
+        # запросами (0 - закрывать после каждого запроса).
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # pgbouncer в режиме transaction pooling не поддерживает
+        # серверные курсоры, которые использует QuerySet.iterator().
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_PGBOUNCER', '').lower() == 'true'
+        ),
+    }
+}
+
+# Проверять SELECT 1 соединения, переживающие запрос, перед их
+# использованием.
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'true').lower() == 'true'
+
+# Пул соединений внутри процесса (только PostgreSQL): соединение
+# возвращается в пул в конце запроса, поэтому CONN_MAX_AGE равен 0.
+# Свободные соединения остаются в пуле до MAX_SIZE, MIN_SIZE открывается
+# заранее.
+if os.getenv('DB_POOL', '').lower() == 'true':
+    DATABASES['default'].update({
+        'ENGINE': 'backend.database.pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
+    })
+
+# Сводки авторов между запросами; действует только с общим кэшем
+# (CACHE_BACKEND не LocMemCache).
+AUTHOR_SUMMARY_CACHE = (
+    os.getenv('AUTHOR_SUMMARY_CACHE', '').lower() == 'true'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
     }
 }
 
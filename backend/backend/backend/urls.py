@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import include, path
+from technol_parts_apps.views import short_link_redirect
 
 urlpatterns_v1 = [
     path('', include('technol_parts_apps.urls')),
@@ -9,5 +10,6 @@ urlpatterns_v1 = [
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include(urlpatterns_v1))
+    path('api/', include(urlpatterns_v1)),
+    path('s/<str:code>', short_link_redirect, name='short-link'),
 ]
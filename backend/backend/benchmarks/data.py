@@ -0,0 +1,175 @@
+import random
+import secrets
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+
+import technol_parts_apps.models as md
+from technol_parts_apps.counters import rebuild_recipe_counters
+from technol_parts_apps.feed import rebuild_feeds
+from technol_parts_apps.reference_cache import bump_version
+from technol_parts_apps.search import update_search_vectors
+
+User = get_user_model()
+
+PREFIX = 'bench'
+BATCH_SIZE = 1000
+TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+
+
+@dataclass
+class BenchmarkData:
+    token: str
+    ingredient_prefix: str
+    popular_ingredient_id: int = None
+    rare_ingredient_id: int = None
+    user_ids: list = field(default_factory=list)
+    recipe_ids: list = field(default_factory=list)
+    tag_ids: list = field(default_factory=list)
+
+
+def sample_others(rng, ids, own_id, count):
+    picked = rng.sample(ids, min(count + 1, len(ids)))
+    return [item for item in picked if item != own_id][:count]
+
+
+def generate(
+    users, recipes, ingredients, follows, favorites, cart, seed=0
+):
+    """Наполняет базу связанными данными только через bulk_create.
+
+    users пользователей, recipes рецептов по ingredients ингредиентов,
+    каждый пользователь подписан на follows авторов, добавил favorites
+    рецептов в избранное и cart рецептов в список покупок.
+    """
+    rng = random.Random(seed)
+    password = make_password(f'{PREFIX}-Passw0rd')
+    md.Tag.objects.bulk_create(
+        [md.Tag(name=name, slug=slug) for name, slug in TAGS],
+        ignore_conflicts=True
+    )
+    tag_ids = list(md.Tag.objects.values_list('id', flat=True))
+
+    missing = ingredients - md.Ingredient.objects.count()
+    if missing > 0:
+        md.Ingredient.objects.bulk_create(
+            [
+                md.Ingredient(
+                    name=f'{PREFIX} ингредиент {number:06d}',
+                    measurement_unit='г'
+                )
+                for number in range(missing)
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    # Популярный ингредиент есть в каждом рецепте, редкий - ни в одном:
+    # по ним видно, зависит ли создание рецепта от популярности.
+    popular, _ = md.Ingredient.objects.get_or_create(
+        name=f'{PREFIX} популярный ингредиент', measurement_unit='г'
+    )
+    rare, _ = md.Ingredient.objects.get_or_create(
+        name=f'{PREFIX} редкий ингредиент', measurement_unit='г'
+    )
+    ingredient_ids = list(md.Ingredient.objects.exclude(
+        pk__in=(popular.pk, rare.pk)
+    ).values_list('id', flat=True))
+    ingredient_prefix = md.Ingredient.objects.values_list(
+        'name', flat=True
+    ).first()[:2]
+
+    run = secrets.token_hex(4)
+    User.objects.bulk_create(
+        [
+            User(
+                username=f'{PREFIX}{run}_{number}',
+                email=f'{PREFIX}{run}_{number}@example.com',
+                first_name='Bench',
+                last_name=f'User{number}',
+                password=password,
+            )
+            for number in range(users)
+        ],
+        batch_size=BATCH_SIZE
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{PREFIX}{run}_'
+    ).order_by('id').values_list('id', flat=True))
+
+    md.Recipe.objects.bulk_create(
+        [
+            md.Recipe(
+                author_id=rng.choice(user_ids),
+                name=f'{PREFIX}{run} рецепт {number}',
+                description='Описание рецепта для нагрузочного теста',
+                cooking_time=rng.randint(1, 180),
+            )
+            for number in range(recipes)
+        ],
+        batch_size=BATCH_SIZE
+    )
+    recipe_ids = list(md.Recipe.objects.filter(
+        name__startswith=f'{PREFIX}{run} '
+    ).order_by('id').values_list('id', flat=True))
+
+    md.RecipeTag.objects.bulk_create(
+        [
+            md.RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+        ],
+        batch_size=BATCH_SIZE
+    )
+    md.RecipeIngredient.objects.bulk_create(
+        [
+            md.RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in [popular.pk] + rng.sample(
+                ingredient_ids, min(ingredients, len(ingredient_ids))
+            )
+        ],
+        batch_size=BATCH_SIZE
+    )
+    md.Follow.objects.bulk_create(
+        [
+            md.Follow(user_id=user_id, following_id=following_id)
+            for user_id in user_ids
+            for following_id in sample_others(rng, user_ids, user_id, follows)
+        ],
+        batch_size=BATCH_SIZE
+    )
+    for model, per_user in ((md.Favorite, favorites), (md.Shopping, cart)):
+        model.objects.bulk_create(
+            [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in rng.sample(
+                    recipe_ids, min(per_user, len(recipe_ids))
+                )
+            ],
+            batch_size=BATCH_SIZE
+        )
+    rebuild_recipe_counters()
+    rebuild_feeds(user_ids)
+    update_search_vectors(md.Recipe.objects.filter(pk__in=recipe_ids))
+    bump_version(md.Tag)
+    bump_version(md.Ingredient)
+    return BenchmarkData(
+        token=Token.objects.create(user_id=user_ids[0]).key,
+        ingredient_prefix=ingredient_prefix,
+        popular_ingredient_id=popular.pk,
+        rare_ingredient_id=rare.pk,
+        user_ids=user_ids,
+        recipe_ids=recipe_ids,
+        tag_ids=tag_ids,
+    )
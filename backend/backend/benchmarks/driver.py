@@ -0,0 +1,159 @@
+import itertools
+import json
+import re
+import time
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+# Картинка 1x1 PNG для создания рецептов.
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg=='
+)
+
+
+def recipe_payload(data, ingredient_id):
+    """Тело создания рецепта; имя рецепта уникально, поэтому оно
+    генерируется заново на каждый запрос."""
+    numbers = itertools.count()
+    return lambda: {
+        'ingredients': [{'id': ingredient_id, 'amount': 10}],
+        'tags': data.tag_ids[:1],
+        'image': IMAGE,
+        'name': f'Рецепт нагрузочного теста {ingredient_id}-{next(numbers)}',
+        'text': 'Описание',
+        'cooking_time': 10,
+    }
+
+
+def get_scenarios(data):
+    """Тройки (имя, путь, фабрика тела POST-запроса или None для GET)."""
+    return (
+        ('recipes-list', '/api/recipes/', None),
+        ('recipes-list-limit', '/api/recipes/?limit=24', None),
+        (
+            'recipes-list-tags',
+            '/api/recipes/?tags=breakfast&tags=lunch', None
+        ),
+        ('recipes-list-favorited', '/api/recipes/?is_favorited=1', None),
+        ('recipes-search', f'/api/recipes/?search={quote("рецепт")}', None),
+        ('recipes-detail', f'/api/recipes/{data.recipe_ids[0]}/', None),
+        ('recipes-feed', '/api/recipes/feed/', None),
+        ('recipes-feed-cursor', '/api/recipes/feed/?cursor=', None),
+        (
+            'users-subscriptions',
+            '/api/users/subscriptions/?recipes_limit=3', None
+        ),
+        (
+            'recipes-download-shopping-cart',
+            '/api/recipes/download_shopping_cart/', None
+        ),
+        ('tags-list', '/api/tags/', None),
+        (
+            'ingredients-search',
+            f'/api/ingredients/?name={quote(data.ingredient_prefix)}', None
+        ),
+        (
+            'recipes-create-popular-ingredient', '/api/recipes/',
+            recipe_payload(data, data.popular_ingredient_id)
+        ),
+        (
+            'recipes-create-rare-ingredient', '/api/recipes/',
+            recipe_payload(data, data.rare_ingredient_id)
+        ),
+    )
+
+
+class ClientDriver:
+    """Запросы через django.test.Client в том же процессе."""
+
+    def __init__(self, token):
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def request(self, path, body=None):
+        with CaptureQueriesContext(connection) as queries:
+            if body is None:
+                response = self.client.get(path)
+            else:
+                response = self.client.post(
+                    path, json.dumps(body), content_type='application/json'
+                )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(queries)
+
+
+class HttpDriver:
+    """Запросы к запущенному серверу по HTTP.
+
+    Число запросов к БД берётся из заголовка Server-Timing, если на
+    сервере включён INSTRUMENTATION.
+    """
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f'Token {token}'}
+
+    def request(self, path, body=None):
+        headers = dict(self.headers)
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with urlopen(request) as response:
+                response.read()
+                server_timing = response.headers.get('Server-Timing', '')
+                status = response.status
+        except HTTPError as error:
+            return error.code, None
+        match = SERVER_TIMING_QUERIES.search(server_timing)
+        return status, int(match.group(1)) if match else None
+
+
+def percentile(values, share):
+    index = min(len(values) - 1, int(round(share * (len(values) - 1))))
+    return values[index]
+
+
+def run(driver, scenarios, requests, warmup):
+    results = {}
+    for name, path, body in scenarios:
+        for _ in range(warmup):
+            driver.request(path, body and body())
+        latencies = []
+        queries = []
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            payload = body and body()
+            start = time.perf_counter()
+            status, query_count = driver.request(path, payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not 200 <= status < 300:
+                errors += 1
+            if query_count is not None:
+                queries.append(query_count)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        results[name] = {
+            'path': path,
+            'requests': requests,
+            'errors': errors,
+            'req_per_s': round(requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'queries_per_request': (
+                round(sum(queries) / len(queries), 1) if queries else None
+            ),
+        }
+    return results
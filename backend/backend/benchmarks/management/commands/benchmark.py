@@ -0,0 +1,129 @@
+import json
+import subprocess
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+from django.utils import timezone
+
+from benchmarks.data import generate
+from benchmarks.driver import ClientDriver, HttpDriver, get_scenarios, run
+from technol_parts_apps.images import executor
+
+SIZE_OPTIONS = (
+    ('users', 50, 'Количество пользователей'),
+    ('recipes', 500, 'Количество рецептов'),
+    ('ingredients', 10, 'Ингредиентов в каждом рецепте'),
+    ('follows', 10, 'Подписок у каждого пользователя'),
+    ('favorites', 20, 'Рецептов в избранном у каждого пользователя'),
+    ('cart', 10, 'Рецептов в списке покупок у каждого пользователя'),
+)
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест API: генерирует данные и замеряет req/s, '
+        'p50/p95/p99 и число запросов к БД по каждому endpoint\'у'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in SIZE_OPTIONS:
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Замеряемых запросов на endpoint',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Прогревочных запросов на endpoint',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', default='bench_results.json',
+            help='Файл для результатов в JSON',
+        )
+        parser.add_argument(
+            '--label',
+            help='Метка прогона в отчёте, например wsgi или asgi',
+        )
+        parser.add_argument(
+            '--base-url',
+            help=(
+                'Адрес запущенного сервера, например http://localhost:8000. '
+                'Данные создаются в настроенной базе, а не в тестовой'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['users'] < 2:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 запрос')
+        sizes = {name: options[name] for name, _, _ in SIZE_OPTIONS}
+        if options['base_url']:
+            data = generate(seed=options['seed'], **sizes)
+            results = run(
+                HttpDriver(options['base_url'], data.token),
+                get_scenarios(data), options['requests'], options['warmup']
+            )
+        else:
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True
+            )
+            try:
+                # Картинки созданных рецептов - во временный каталог.
+                with tempfile.TemporaryDirectory() as media_root, \
+                        override_settings(MEDIA_ROOT=media_root):
+                    data = generate(seed=options['seed'], **sizes)
+                    results = run(
+                        ClientDriver(data.token), get_scenarios(data),
+                        options['requests'], options['warmup']
+                    )
+                    # Копии картинок строятся в фоне: дождаться их, пока
+                    # временный каталог и тестовая база существуют.
+                    executor.shutdown(wait=True)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        report = {
+            'commit': get_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'mode': 'http' if options['base_url'] else 'client',
+            'label': options['label'],
+            'sizes': sizes,
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+        self.stdout.write(
+            f'{"endpoint":32} {"req/s":>8} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"queries":>8} {"errors":>6}'
+        )
+        for name, row in results.items():
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f'{name:32} {row["req_per_s"]:>8.1f} {row["p50_ms"]:>8.2f} '
+                f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} '
+                f'{"-" if queries is None else queries:>8} '
+                f'{row["errors"]:>6}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
@@ -0,0 +1,71 @@
+# Настройки gunicorn, значения по умолчанию выводятся из числа ядер.
+# SERVER_MODE=wsgi (по умолчанию) - gthread-воркеры и backend.wsgi,
+# SERVER_MODE=asgi - uvicorn-воркеры и backend.asgi.
+import math
+import os
+
+
+def read_cpu_quota():
+    """Лимит CPU контейнера из cgroup v2 (cpu.max) или v1 (cfs_quota_us)."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as file:
+                quota = file.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as file:
+                period = file.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    return max(math.ceil(int(quota) / int(period)), 1)
+
+
+def get_cpu_count():
+    """Доступные процессу CPU: affinity и квота контейнера, а не число
+    ядер хоста, как в multiprocessing.cpu_count()."""
+    cpu_count = len(os.sched_getaffinity(0))
+    quota = read_cpu_quota()
+    if quota is not None:
+        cpu_count = min(cpu_count, quota)
+    return cpu_count
+
+
+cpu_count = get_cpu_count()
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if server_mode == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.getenv('GUNICORN_WORKERS', cpu_count * 2 + 1))
+else:
+    wsgi_app = 'backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', min(max(cpu_count, 2), 8)))
+    # Параллелизм дают потоки, поэтому воркеров меньше: каждый поток
+    # держит своё соединение с БД.
+    workers = int(os.getenv(
+        'GUNICORN_WORKERS', cpu_count + 1 if threads > 1 else cpu_count * 2 + 1
+    ))
+
+# Перезапуск воркеров после max_requests запросов (с разбросом, чтобы
+# они не перезапускались одновременно) ограничивает рост памяти.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Соединения с БД, открытые мастером при загрузке приложения, не
+    # должны достаться воркерам.
+    from django.db import connections
+
+    connections.close_all()
@@ -1,20 +1,41 @@
 from django.contrib import admin
+from django.db.models import Prefetch
 
 import technol_parts_apps.models as md
+from technol_parts_apps.pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*): общее число записей не считается,
+    а на больших таблицах берётся оценка из статистики PostgreSQL."""
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 class RecipeIngredientInline(admin.StackedInline):
     model = md.RecipeIngredient
     extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'ingredient', 'recipe__author'
+        )
 
 
 class RecipeTagInline(admin.StackedInline):
     model = md.RecipeTag
     extra = 0
+    autocomplete_fields = ('tag',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'tag', 'recipe__author'
+        )
 
 
 @admin.register(md.Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     inlines = (
         RecipeIngredientInline, RecipeTagInline
     )
@@ -34,6 +55,16 @@ class RecipeAdmin(admin.ModelAdmin):
         'author__username'
     )
     list_filter = ('tags',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(
+            'search_vector'
+        ).prefetch_related(Prefetch(
+            'recipes_ingredient',
+            queryset=md.RecipeIngredient.objects.select_related('ingredient')
+        ))
 
     def get_ingredient(self, instance):
         return [
@@ -42,10 +73,11 @@ class RecipeAdmin(admin.ModelAdmin):
         ]
 
     def all_favorite(self, obj):
-        return obj.recipes.count()
+        return obj.favorites_count
 
     get_ingredient.short_description = 'Ингредиенты'
     all_favorite.short_description = 'Избрано пользователями'
+    all_favorite.admin_order_field = 'favorites_count'
 
 
 @admin.register(md.Ingredient)
@@ -54,9 +86,35 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
-admin.site.register(md.Favorite)
-admin.site.register(md.Follow)
-admin.site.register(md.RecipeIngredient)
-admin.site.register(md.RecipeTag)
-admin.site.register(md.Shopping)
-admin.site.register(md.Tag)
+@admin.register(md.Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug')
+    search_fields = ('name', 'slug')
+
+
+@admin.register(md.Favorite, md.Shopping)
+class UserRecipeAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(md.Follow)
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'following')
+    list_select_related = ('user', 'following')
+    autocomplete_fields = ('user', 'following')
+
+
+@admin.register(md.RecipeIngredient)
+class RecipeIngredientAdmin(LargeTableAdmin):
+    list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe__author', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+
+@admin.register(md.RecipeTag)
+class RecipeTagAdmin(LargeTableAdmin):
+    list_display = ('id', 'recipe', 'tag')
+    list_select_related = ('recipe__author', 'tag')
+    autocomplete_fields = ('recipe', 'tag')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TechnolPartsAppsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'technol_parts_apps'
+
+    def ready(self):
+        import technol_parts_apps.signals  # noqa: F401
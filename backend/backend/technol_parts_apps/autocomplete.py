@@ -0,0 +1,67 @@
+import threading
+import time
+from bisect import bisect_left
+
+import technol_parts_apps.constants as const
+from .models import Ingredient
+
+
+class IngredientPrefixIndex:
+    """Справочник ингредиентов в памяти процесса для поиска по началу.
+
+    Ключи хранятся отсортированными в нижнем регистре, поэтому поиск по
+    префиксу - это bisect и проход по соседним элементам, а точное
+    совпадение всегда оказывается первым.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = None
+        self.built_at = 0
+
+    def invalidate(self):
+        self.data = None
+
+    def get_data(self):
+        data = self.data
+        if data is not None and time.monotonic() - self.built_at < self.ttl:
+            return data
+        with self.lock:
+            if self.data is data:
+                self.data = self.build()
+                self.built_at = time.monotonic()
+            return self.data
+
+    def build(self):
+        entries = sorted(
+            (
+                (name.lower(), {
+                    'id': pk, 'name': name, 'measurement_unit': unit
+                })
+                for pk, name, unit in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                )
+            ),
+            key=lambda entry: entry[0]
+        )
+        return (
+            [key for key, _ in entries],
+            [item for _, item in entries],
+        )
+
+    def search(self, prefix, limit):
+        keys, items = self.get_data()
+        prefix = prefix.lower()
+        start = bisect_left(keys, prefix)
+        result = []
+        for key, item in zip(
+            keys[start:start + limit], items[start:start + limit]
+        ):
+            if not key.startswith(prefix):
+                break
+            result.append(item)
+        return result
+
+
+ingredient_index = IngredientPrefixIndex(ttl=const.INGREDIENT_INDEX_TTL)
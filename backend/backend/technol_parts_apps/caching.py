@@ -0,0 +1,15 @@
+from django.conf import settings
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_cache_shared(alias='default'):
+    """Кэш общий для всех процессов сервера (Redis, Memcached, БД, файлы).
+
+    Версии в локальном кэше увеличиваются только в том процессе, где
+    изменились данные, поэтому долгоживущие записи в нём держать нельзя.
+    """
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
@@ -7,3 +7,27 @@ RECIPE_NAME_LENGTH = 256
 TEXT_LENGTH = 1000
 MIN_AMOUNT_COOKING_TIME = 1
 MAX_AMOUNT_COOKING_TIME = 32_000
+SHOPPING_CART_FORMAT_PARAM = 'file_format'
+SHOPPING_CART_FORMAT = 'txt'
+LOAD_BATCH_SIZE = 1000
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_INDEX_TTL = 60
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_LOCAL_TIMEOUT = 60
+INSTRUMENTATION_WINDOW = 1000
+INSTRUMENTATION_FLUSH_INTERVAL = 10
+MAX_PAGE_SIZE = 100
+IMAGE_EXTENSIONS = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+IMAGE_WORKERS = 2
+THUMBNAIL_QUALITY = 80
+ORIGINAL_QUALITY = 90
+FEED_FANOUT_LIMIT = 10_000
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+SEARCH_CONFIG = 'russian'
+SHORT_LINK_MAX_LENGTH = 11
+SHORT_LINK_CACHE_SIZE = 10_000
+SHORT_LINK_FLUSH_INTERVAL = 10
+USER_RELATIONS_TIMEOUT = 60 * 60
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Follow, Recipe, Shopping
+
+User = get_user_model()
+
+RECIPE_COUNTERS = (
+    ('favorites_count', Favorite),
+    ('shopping_cart_count', Shopping),
+)
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    """Атомарно меняет счётчик рецепта одним UPDATE через F()."""
+    return Recipe.objects.filter(pk=recipe_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_for_recipe(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def rebuild_recipe_counters():
+    """Пересчитывает все счётчики рецептов одним UPDATE."""
+    return Recipe.objects.update(**{
+        field: count_for_recipe(model) for field, model in RECIPE_COUNTERS
+    })
+
+
+def change_followers_counter(author_id, delta):
+    """Атомарно меняет число подписчиков автора."""
+    return User.objects.filter(pk=author_id).update(
+        followers_count=Greatest(F('followers_count') + delta, 0)
+    )
+
+
+def rebuild_followers_counters(author_ids=None):
+    """Пересчитывает число подписчиков авторов одним UPDATE."""
+    authors = User.objects.all()
+    if author_ids is not None:
+        authors = authors.filter(pk__in=author_ids)
+    return authors.update(followers_count=Coalesce(
+        Subquery(
+            Follow.objects.filter(
+                following=OuterRef('pk')
+            ).order_by().values('following').annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    ))
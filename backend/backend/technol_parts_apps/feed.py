@@ -0,0 +1,134 @@
+from collections import namedtuple
+from itertools import chain, islice
+
+from django.db import connection
+from django.db.models import Q
+
+import technol_parts_apps.constants as const
+from .counters import rebuild_followers_counters
+from .models import FeedEntry, Follow, Recipe, User
+
+# Позиция рецепта в ленте, порядок кортежей совпадает с порядком ленты.
+FeedPosition = namedtuple('FeedPosition', ('pub_date', 'pk'))
+
+
+def is_pull_author(author_id):
+    """Автор, у которого подписчиков больше FEED_FANOUT_LIMIT.
+
+    Его рецепты не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=const.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def bulk_insert(entries, batch_size=const.FEED_BATCH_SIZE):
+    entries = iter(entries)
+    created = 0
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return created
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+
+
+def fan_out_recipe(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if is_pull_author(recipe.author_id):
+        return 0
+    follower_ids = Follow.objects.filter(
+        following_id=recipe.author_id
+    ).order_by().values_list('user_id', flat=True).iterator(
+        chunk_size=const.FEED_BATCH_SIZE
+    )
+    return bulk_insert(
+        FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def backfill_feed(user_id, author_id, limit=const.FEED_BACKFILL_SIZE):
+    """Последние рецепты автора в ленту нового подписчика."""
+    if is_pull_author(author_id):
+        return 0
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')
+    if limit is not None:
+        recipes = recipes[:limit]
+    return bulk_insert(
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes.iterator()
+    )
+
+
+def remove_author_from_feed(user_id, author_id):
+    return FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()[0]
+
+
+def get_pulled_author_ids(user):
+    """Авторы в режиме чтения, на которых подписан пользователь."""
+    return list(Follow.objects.filter(
+        user=user, following__followers_count__gt=const.FEED_FANOUT_LIMIT
+    ).order_by().values_list('following_id', flat=True))
+
+
+def get_feed_positions(user, pulled_author_ids, limit, before=None):
+    """Первые limit позиций ленты с авторами в режиме чтения.
+
+    Каждый источник - диапазон индекса с LIMIT: (user, pub_date) для
+    записей ленты и (author, pub_date) для рецептов каждого автора,
+    before - позиция, после которой начинается выборка (курсор). Где БД
+    умеет LIMIT внутри UNION, источники читаются одним запросом.
+    """
+    sources = [(FeedEntry.objects.filter(user=user), 'recipe_id')] + [
+        (Recipe.objects.filter(author_id=author_id), 'pk')
+        for author_id in pulled_author_ids
+    ]
+    parts = []
+    for queryset, pk_field in sources:
+        if before is not None:
+            pub_date, pk = before
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f'{pk_field}__lt': pk})
+            )
+        parts.append(queryset.order_by(
+            '-pub_date', f'-{pk_field}'
+        ).values_list('pub_date', pk_field)[:limit])
+    if connection.features.supports_slicing_ordering_in_compound:
+        rows = parts[0].union(*parts[1:])
+    else:
+        rows = chain.from_iterable(parts)
+    # Рецепт автора, перешедшего в режим чтения, может остаться и в
+    # записях ленты.
+    return sorted(map(FeedPosition._make, set(rows)), reverse=True)[:limit]
+
+
+def rebuild_feeds(user_ids=None):
+    """Собирает ленты заново по текущим подпискам.
+
+    Сначала пересчитывает число подписчиков авторов: от него зависит,
+    раскладываются ли их рецепты по лентам.
+    """
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+        rebuild_followers_counters(follows.values('following_id'))
+    else:
+        rebuild_followers_counters()
+    follows = follows.exclude(
+        following__followers_count__gt=const.FEED_FANOUT_LIMIT
+    )
+    entries.delete()
+    created = 0
+    for user_id, author_id in follows.order_by('user_id').values_list(
+        'user_id', 'following_id'
+    ).iterator(chunk_size=const.FEED_BATCH_SIZE):
+        created += backfill_feed(user_id, author_id, limit=None)
+    return created
@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+
+from .images import pending_name, published_name
+
+
+class SearchVectorField(models.Field):
+    """tsvector в PostgreSQL, в остальных базах - пустой текстовый столбец.
+
+    Своё поле вместо django.contrib.postgres, чтобы модели загружались без
+    psycopg2 (локальный запуск на SQLite).
+    """
+    description = 'Поисковый вектор'
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return 'text'
+
+
+@SearchVectorField.register_lookup
+class Matches(models.Lookup):
+    """search_vector @@ tsquery."""
+    lookup_name = 'matches'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} @@ {rhs}', (*lhs_params, *rhs_params)
+
+
+class ProcessedImageFieldFile(ImageFieldFile):
+    """Загрузка сохраняется под pending_name, а в поле сразу пишется
+    итоговое имя; изображение под ним появляется после publish_image."""
+
+    pending = False
+
+    def save(self, name, content, save=True):
+        name = self.field.generate_filename(
+            self.instance, published_name(content)
+        )
+        self.storage.save(pending_name(name), content)
+        self.name = name
+        self._committed = True
+        self.pending = True
+        # Сам объект, а не имя: по отметке pending обработчик post_save
+        # узнаёт новую загрузку.
+        setattr(self.instance, self.field.attname, self)
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ProcessedImageField(models.ImageField):
+    """ImageField, загрузки которого публикуются в фоне без метаданных.
+
+    Пока publish_image не отработал, ссылка на изображение отвечает 404,
+    но исходный файл с EXIF по ней не отдаётся.
+    """
+    attr_class = ProcessedImageFieldFile
@@ -0,0 +1,68 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+from django_filters.fields import MultipleChoiceField
+
+from .models import Favorite, Recipe, RecipeTag, Shopping
+from .search import search_recipes
+
+
+class AnySlugMultipleChoiceField(MultipleChoiceField):
+    """Список slug'ов без сверки со справочником тегов."""
+
+    def valid_value(self, value):
+        return True
+
+
+class SlugMultipleChoiceFilter(filters.MultipleChoiceFilter):
+    field_class = AnySlugMultipleChoiceField
+
+
+class RecipeFilter(filters.FilterSet):
+    """Фильтрация рецептов через EXISTS подзапросы."""
+    tags = SlugMultipleChoiceFilter(method='filter_tags')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited')
+    is_in_shopping_cart = filters.BooleanFilter(
+        method='filter_is_in_shopping_cart'
+    )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'popular'),),
+        method='filter_ordering',
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+            'search', 'ordering',
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=value
+        )))
+
+    def filter_user_relation(self, queryset, model, value):
+        user = self.request.user
+        if not value or not user.is_authenticated:
+            return queryset
+        return queryset.filter(Exists(model.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        )))
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Shopping, value)
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by('-favorites_count', '-pub_date', '-id')
@@ -0,0 +1,233 @@
+import binascii
+import io
+import logging
+import posixpath
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils.crypto import salted_hmac
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+import technol_parts_apps.constants as const
+
+logger = logging.getLogger(__name__)
+
+# base64 декодируется кусками, кратными 4 символам.
+DECODE_CHUNK = 64 * 1024
+# Каталог хранилища для загрузок, ещё не прошедших publish_image.
+PENDING_DIRECTORY = 'pending'
+
+THUMBNAIL_SIZES = {
+    'small': (300, 300),
+    'medium': (600, 600),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=const.IMAGE_WORKERS, thread_name_prefix='images'
+)
+
+
+def decode_base64_image(data, max_size):
+    """Декодирует data:image/...;base64,... с ограничением размера."""
+    try:
+        header, encoded = data.split(';base64,', 1)
+    except ValueError:
+        raise serializers.ValidationError('Некорректное изображение.')
+    extension = header.split('/')[-1].lower()
+    if extension not in const.IMAGE_EXTENSIONS:
+        raise serializers.ValidationError(
+            'Допустимые форматы изображений: '
+            f'{", ".join(const.IMAGE_EXTENSIONS)}.'
+        )
+    size_error = serializers.ValidationError(
+        f'Размер изображения не может превышать {max_size} байт.'
+    )
+    if len(encoded) // 4 * 3 > max_size + 2:
+        raise size_error
+    output = io.BytesIO()
+    try:
+        for start in range(0, len(encoded), DECODE_CHUNK):
+            output.write(
+                binascii.a2b_base64(encoded[start:start + DECODE_CHUNK])
+            )
+            if output.tell() > max_size:
+                raise size_error
+    except binascii.Error:
+        raise serializers.ValidationError('Некорректное изображение.')
+    return ContentFile(
+        output.getvalue(), name=f'{uuid.uuid4().hex}.{extension}'
+    )
+
+
+def pending_name(name):
+    """Имя необработанной загрузки в хранилище.
+
+    Подписано SECRET_KEY, поэтому по имени опубликованного изображения
+    его не угадать.
+    """
+    return posixpath.join(
+        PENDING_DIRECTORY,
+        salted_hmac('technol_parts_apps.images', name).hexdigest()
+    )
+
+
+def published_name(file):
+    """Случайное имя с расширением, которое будет после перекодирования."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            extension = 'jpg' if image.format == 'JPEG' else 'webp'
+    except (OSError, Image.DecompressionBombError):
+        extension = 'webp'
+    file.seek(0)
+    return f'{uuid.uuid4().hex}.{extension}'
+
+
+def reencode_image(file):
+    """Оригинал без метаданных (EXIF, GPS, комментарии).
+
+    Ориентация из EXIF применяется к пикселям, JPEG сохраняется в JPEG,
+    остальные форматы - в WebP (у анимации остаётся первый кадр).
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        icc_profile = image.info.get('icc_profile')
+        is_jpeg = image.format == 'JPEG'
+        image = ImageOps.exif_transpose(image)
+        buffer = io.BytesIO()
+        if is_jpeg:
+            image.convert('RGB').save(
+                buffer, 'JPEG', quality=const.ORIGINAL_QUALITY,
+                icc_profile=icc_profile
+            )
+        else:
+            image.convert(
+                'RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB'
+            ).save(
+                buffer, 'WEBP', quality=const.ORIGINAL_QUALITY,
+                icc_profile=icc_profile
+            )
+    return ContentFile(buffer.getvalue())
+
+
+def publish_image(name):
+    """Перекодирует загрузку из pending_name(name) и сохраняет её как name.
+
+    Возвращает True, если изображение name есть в хранилище.
+    """
+    pending = pending_name(name)
+    if not default_storage.exists(pending):
+        return default_storage.exists(name)
+    try:
+        if not default_storage.exists(name):
+            with default_storage.open(pending) as file:
+                default_storage.save(name, reencode_image(file))
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('Не удалось обработать изображение %s', name)
+        return False
+    finally:
+        default_storage.delete(pending)
+    return True
+
+
+class Base64ImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            data = decode_base64_image(data, const.MAX_IMAGE_SIZE)
+        return super().to_internal_value(data)
+
+
+def thumbnail_name(name, size):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'thumbnails', f'{stem}_{size}.webp')
+
+
+def make_thumbnails(name):
+    """Уменьшенные копии изображения в WebP без метаданных.
+
+    Возвращает True, если все копии есть в хранилище.
+    """
+    missing = {
+        size: dimensions for size, dimensions in THUMBNAIL_SIZES.items()
+        if not default_storage.exists(thumbnail_name(name, size))
+    }
+    if not missing:
+        return True
+    try:
+        with default_storage.open(name) as file, Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert(
+                'RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB'
+            )
+            for size, dimensions in missing.items():
+                thumbnail = image.copy()
+                thumbnail.thumbnail(dimensions)
+                buffer = io.BytesIO()
+                thumbnail.save(
+                    buffer, 'WEBP', quality=const.THUMBNAIL_QUALITY
+                )
+                default_storage.save(
+                    thumbnail_name(name, size), ContentFile(buffer.getvalue())
+                )
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('Не удалось обработать изображение %s', name)
+        return False
+    return True
+
+
+def process_image(model, field_name, name, ready_field=None):
+    """Публикует загрузку и строит копии, если у модели есть ready_field.
+
+    Готовность копий отмечается в ready_field записи именем изображения,
+    поэтому после замены картинки старая отметка перестаёт совпадать без
+    отдельного сброса.
+    """
+    if not publish_image(name) or ready_field is None:
+        return 0
+    if not make_thumbnails(name):
+        return 0
+    return model.objects.filter(**{field_name: name}).update(
+        **{ready_field: name}
+    )
+
+
+def run_process_image(*args):
+    try:
+        process_image(*args)
+    finally:
+        # Соединения потока пула не должны оставаться открытыми.
+        connections.close_all()
+
+
+def schedule_image(model, field_name, name, ready_field=None):
+    executor.submit(run_process_image, model, field_name, name, ready_field)
+
+
+class ThumbnailImageField(serializers.ImageField):
+    """Ссылка на уменьшенную копию, пока её нет - на оригинал.
+
+    Готовность копий берётся из поля ready_field той же записи, без
+    обращения к хранилищу.
+    """
+
+    def __init__(self, size, ready_field='thumbnails_source', **kwargs):
+        self.size = size
+        self.ready_field = ready_field
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if getattr(value.instance, self.ready_field, None) != value.name:
+            return super().to_representation(value)
+        url = default_storage.url(thumbnail_name(value.name, self.size))
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -0,0 +1,180 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+import technol_parts_apps.constants as const
+
+SAMPLE_FIELDS = ('total', 'db', 'queries', 'serialize', 'connect')
+
+
+class RequestMetrics:
+    """Счётчики одного запроса, заодно execute_wrapper для соединений."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.connect_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+@contextmanager
+def timed_connect(connection, metrics):
+    """Время открытия соединения (или получения его из пула)."""
+    connect = connection.connect
+
+    def timed():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            metrics.connect_time += time.perf_counter() - start
+
+    connection.connect = timed
+    try:
+        yield
+    finally:
+        del connection.connect
+
+
+class MetricsRegistry:
+    """Последние замеры по каждому endpoint'у в памяти процесса.
+
+    Раз в flush_interval секунд снимок пишется в файл <pid>.json, откуда
+    его читает команда instrumentation_report. При выходе процесса
+    (перезапуск воркера по max_requests) файл удаляется.
+    """
+
+    def __init__(self, directory, window, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.lock = threading.Lock()
+        self.last_flush = 0
+        atexit.register(self.remove_snapshot)
+
+    def record(self, endpoint, sample):
+        with self.lock:
+            self.samples[endpoint].append(sample)
+            if time.monotonic() - self.last_flush < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.samples:
+                return
+            self.last_flush = time.monotonic()
+            snapshot = {
+                endpoint: list(samples)
+                for endpoint, samples in self.samples.items()
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path()
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'fields': SAMPLE_FIELDS, 'samples': snapshot}, file)
+        os.replace(f'{path}.tmp', path)
+
+    def get_path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def remove_snapshot(self):
+        try:
+            os.remove(self.get_path())
+        except FileNotFoundError:
+            pass
+
+
+def get_endpoint(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None or not resolver_match.url_name:
+        return f'{request.method} unresolved'
+    return f'{request.method} {resolver_match.url_name}'
+
+
+class InstrumentationMiddleware:
+    """Число запросов к БД и время обработки каждого API запроса.
+
+    Подключается в settings только при INSTRUMENTATION=true.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.registry = MetricsRegistry(
+            settings.INSTRUMENTATION_DIR,
+            const.INSTRUMENTATION_WINDOW,
+            const.INSTRUMENTATION_FLUSH_INTERVAL,
+        )
+
+    def __call__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+                stack.enter_context(timed_connect(connection, metrics))
+            response = self.get_response(request)
+        total = (time.perf_counter() - start) * 1000
+        db_time = metrics.db_time * 1000
+        serialize_time = metrics.serialize_time * 1000
+        connect_time = metrics.connect_time * 1000
+        response['Server-Timing'] = (
+            f'db;dur={db_time:.1f};desc="{metrics.queries} queries", '
+            f'connect;dur={connect_time:.1f}, '
+            f'serialize;dur={serialize_time:.1f}, '
+            f'total;dur={total:.1f}'
+        )
+        self.registry.record(get_endpoint(request), (
+            round(total, 3),
+            round(db_time, 3),
+            metrics.queries,
+            round(serialize_time, 3),
+            round(connect_time, 3),
+        ))
+        return response
+
+
+def instrument_serializer(request, serializer):
+    """Засекает время to_representation без учёта запросов к БД."""
+    metrics = getattr(request, 'metrics', None)
+    if metrics is None:
+        return serializer
+    to_representation = serializer.to_representation
+
+    @wraps(to_representation)
+    def timed_to_representation(*args, **kwargs):
+        start = time.perf_counter()
+        db_time = metrics.db_time
+        try:
+            return to_representation(*args, **kwargs)
+        finally:
+            metrics.serialize_time += (
+                time.perf_counter() - start - (metrics.db_time - db_time)
+            )
+
+    serializer.to_representation = timed_to_representation
+    return serializer
+
+
+class InstrumentedViewMixin:
+    """Учитывает время сериализации в метриках InstrumentationMiddleware."""
+
+    def get_serializer(self, *args, **kwargs):
+        return instrument_serializer(
+            self.request, super().get_serializer(*args, **kwargs)
+        )
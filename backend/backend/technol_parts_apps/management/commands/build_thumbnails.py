@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from technol_parts_apps.images import process_image, publish_image
+from technol_parts_apps.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Уменьшенные копии для уже загруженных изображений рецептов и '
+        'публикация загрузок, которые не успели обработаться'
+    )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).exclude(thumbnails_source=F('image')).order_by('pk')
+        ready = 0
+        for name in recipes.values_list('image', flat=True).iterator():
+            ready += process_image(
+                Recipe, 'image', name, 'thumbnails_source'
+            )
+        avatars = User.objects.exclude(avatar='').exclude(
+            avatar__isnull=True
+        ).order_by('pk')
+        for name in avatars.values_list('avatar', flat=True).iterator():
+            publish_image(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Копии построены для {ready} рецептов'
+        ))
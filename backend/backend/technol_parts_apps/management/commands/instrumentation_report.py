@@ -0,0 +1,108 @@
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def percentile(values, share):
+    index = min(len(values) - 1, int(round(share * (len(values) - 1))))
+    return values[index]
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def summarize(samples):
+    totals = sorted(sample['total'] for sample in samples)
+    histogram = dict.fromkeys(
+        [f'<={bucket}' for bucket in HISTOGRAM_BUCKETS] + ['inf'], 0
+    )
+    for total in totals:
+        bucket = next(
+            (f'<={bucket}' for bucket in HISTOGRAM_BUCKETS if total <= bucket),
+            'inf'
+        )
+        histogram[bucket] += 1
+    count = len(samples)
+    return {
+        'requests': count,
+        'p50_ms': percentile(totals, 0.5),
+        'p95_ms': percentile(totals, 0.95),
+        'p99_ms': percentile(totals, 0.99),
+        'avg_queries': sum(s['queries'] for s in samples) / count,
+        'max_queries': max(s['queries'] for s in samples),
+        'avg_db_ms': sum(s['db'] for s in samples) / count,
+        'avg_serialize_ms': sum(s['serialize'] for s in samples) / count,
+        'avg_connect_ms': sum(s.get('connect', 0) for s in samples) / count,
+        'histogram_ms': histogram,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сводка замеров InstrumentationMiddleware по всем процессам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести сводку в JSON',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Удалить накопленные снимки после вывода',
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(settings.INSTRUMENTATION_DIR)
+        samples = defaultdict(list)
+        files = sorted(directory.glob('*.json')) if directory.is_dir() else []
+        for path in files:
+            # Файлы воркеров, убитых без atexit (SIGKILL по timeout).
+            if path.stem.isdigit() and not is_process_alive(int(path.stem)):
+                path.unlink(missing_ok=True)
+                continue
+            snapshot = json.loads(path.read_text(encoding='utf-8'))
+            fields = snapshot['fields']
+            for endpoint, rows in snapshot['samples'].items():
+                samples[endpoint].extend(
+                    dict(zip(fields, row)) for row in rows
+                )
+        report = {
+            endpoint: summarize(rows)
+            for endpoint, rows in sorted(samples.items())
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        elif not report:
+            self.stdout.write(f'Нет замеров в {directory}')
+        else:
+            self.stdout.write(
+                f'{"endpoint":40} {"n":>6} {"p50":>8} {"p95":>8} '
+                f'{"p99":>8} {"queries":>8} {"db":>8} {"serialize":>9} '
+                f'{"connect":>8}'
+            )
+            for endpoint, row in report.items():
+                self.stdout.write(
+                    f'{endpoint:40} {row["requests"]:>6} '
+                    f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+                    f'{row["p99_ms"]:>8.1f} {row["avg_queries"]:>8.1f} '
+                    f'{row["avg_db_ms"]:>8.1f} '
+                    f'{row["avg_serialize_ms"]:>9.1f} '
+                    f'{row["avg_connect_ms"]:>8.1f}'
+                )
+        if options['reset']:
+            for path in files:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,186 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+import technol_parts_apps.constants as const
+from technol_parts_apps.models import Ingredient
+from technol_parts_apps.reference_cache import bump_version
+
+JSON_READ_SIZE = 64 * 1024
+# Пробельные символы JSON.
+WHITESPACE = ' \t\r\n'
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+        else:
+            yield None, None
+
+
+def iter_json(file):
+    """Построчно отдаёт объекты JSON-массива, не читая файл целиком.
+
+    Между элементами должна быть ровно одна запятая, после закрывающей
+    скобки - только пробельные символы.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    # Что ожидается дальше: '[', первый элемент или ']', элемент после
+    # запятой, ',' или ']' после элемента, конец файла.
+    expected = 'start'
+    number = 0
+    for chunk in iter(lambda: file.read(JSON_READ_SIZE), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position >= len(buffer):
+                break
+            char = buffer[position]
+            if expected == 'end':
+                raise CommandError(
+                    'Лишние данные после JSON массива: '
+                    f'{buffer[position:].strip()[:50]!r}'
+                )
+            if expected == 'start':
+                if char != '[':
+                    raise CommandError('JSON файл должен содержать массив')
+                expected = 'first'
+                position += 1
+                continue
+            if expected == 'separator':
+                if char not in ',]':
+                    raise CommandError(
+                        f'После элемента {number} JSON массива ожидается '
+                        f'"," или "]": {buffer[position:].strip()[:50]!r}'
+                    )
+                expected = 'item' if char == ',' else 'end'
+                position += 1
+                continue
+            if expected == 'first' and char == ']':
+                expected = 'end'
+                position += 1
+                continue
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Объект может продолжаться в следующем куске файла.
+                break
+            number += 1
+            if not isinstance(item, dict):
+                raise CommandError(
+                    f'Элемент {number} JSON массива должен быть объектом'
+                )
+            expected = 'separator'
+            yield item.get('name'), item.get('measurement_unit')
+        buffer = buffer[position:]
+    if expected == 'start':
+        raise CommandError('JSON файл должен содержать массив')
+    if expected == 'end':
+        return
+    if buffer.strip(WHITESPACE):
+        raise CommandError(
+            f'Некорректный JSON после элемента {number}: '
+            f'{buffer.strip()[:50]!r}'
+        )
+    raise CommandError('JSON массив не закрыт: файл обрезан')
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загрузка ингредиентов из CSV (name,unit) или JSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR / 'ingredients.csv',
+            help='Путь к файлу, по умолчанию ingredients.csv проекта',
+        )
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=const.LOAD_BATCH_SIZE,
+            help='Количество строк в одном INSERT',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать и проверить файл без записи в базу',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        file_format = options['file_format'] or path.suffix.lstrip('.')
+        if file_format not in READERS:
+            raise CommandError(
+                f'Неизвестный формат "{file_format}", '
+                f'укажите --format ({", ".join(READERS)})'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        start = time.monotonic()
+        total = skipped = 0
+        created_before = Ingredient.objects.count()
+        # Ошибка в середине файла не должна оставить загрузку частичной.
+        with transaction.atomic(), open(path, encoding='utf-8') as file:
+            rows = self.iter_ingredients(READERS[file_format](file))
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                valid = [item for item in batch if item is not None]
+                skipped += len(batch) - len(valid)
+                total += len(valid)
+                if not options['dry_run']:
+                    Ingredient.objects.bulk_create(
+                        valid, ignore_conflicts=True
+                    )
+        if not options['dry_run']:
+            # bulk_create не отправляет post_save, сбрасываем кэш вручную.
+            bump_version(Ingredient)
+        elapsed = time.monotonic() - start
+        rate = total / elapsed if elapsed else total
+        created = Ingredient.objects.count() - created_before
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if options["dry_run"] else "Обработано"} '
+            f'{total} строк за {elapsed:.2f} с ({rate:.0f} строк/с), '
+            f'добавлено {created}, пропущено некорректных {skipped}'
+        ))
+
+    def iter_ingredients(self, rows):
+        for name, measurement_unit in rows:
+            name = (name or '').strip()
+            measurement_unit = (measurement_unit or '').strip()
+            if (
+                not name
+                or not measurement_unit
+                or len(name) > const.MAX_LENGTH_NAME
+                or len(measurement_unit) > const.MAX_LENGTH_NAME_UNIT
+            ):
+                yield None
+                continue
+            yield Ingredient(name=name, measurement_unit=measurement_unit)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from technol_parts_apps.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок из текущих подписок и рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_feeds(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'В ленты добавлено {created} записей'
+        ))
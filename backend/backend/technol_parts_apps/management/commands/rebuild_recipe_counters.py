@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from technol_parts_apps.counters import rebuild_recipe_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного и списка покупок у рецептов'
+
+    def handle(self, *args, **options):
+        updated = rebuild_recipe_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны у {updated} рецептов'
+        ))
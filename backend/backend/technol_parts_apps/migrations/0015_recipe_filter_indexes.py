@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('technol_parts_apps', '0014_alter_recipetag_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'recipe'], name='favorite_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tag', 'recipe'], name='recipetag_tag_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopping',
+            index=models.Index(fields=['user', 'recipe'], name='shopping_user_recipe_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:45
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicates(apps, schema_editor):
+    for model_name, fields in (
+        ('Favorite', ('user', 'recipe')),
+        ('Shopping', ('user', 'recipe')),
+        ('Follow', ('user', 'following')),
+    ):
+        model = apps.get_model('technol_parts_apps', model_name)
+        keep_ids = model.objects.values(*fields).annotate(
+            keep_id=Min('id')
+        ).values('keep_id')
+        model.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('technol_parts_apps', '0015_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='favorite',
+            name='favorite_user_recipe_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='shopping',
+            name='shopping_user_recipe_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'following'), name='unique_follow_user_following'),
+        ),
+        migrations.AddConstraint(
+            model_name='shopping',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_user_recipe'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('technol_parts_apps', '0022_recipe_short_link_hits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnails_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Изображение с готовыми уменьшенными копиями'),
+        ),
+    ]
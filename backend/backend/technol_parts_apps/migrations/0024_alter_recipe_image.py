@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:44
+
+from django.db import migrations
+import technol_parts_apps.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('technol_parts_apps', '0023_recipe_thumbnails_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=technol_parts_apps.fields.ProcessedImageField(blank=True, null=True, upload_to='recipes/'),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 import technol_parts_apps.constants as const
 import technol_parts_apps.validators as vd
 from .abstract_models import NameFieldModelBase
+from .fields import ProcessedImageField, SearchVectorField
 
 User = get_user_model()
 
@@ -11,9 +12,16 @@ User = get_user_model()
 class Recipe(NameFieldModelBase):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='recipes')
-    image = models.ImageField(
+    image = ProcessedImageField(
         upload_to='recipes/', null=True, blank=True
     )
+    thumbnails_source = models.CharField(
+        verbose_name='Изображение с готовыми уменьшенными копиями',
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True,
@@ -28,11 +36,44 @@ class Recipe(NameFieldModelBase):
     )
     tags = models.ManyToManyField(
         'Tag', through='RecipeTag', null=True, blank=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+    short_link_hits = models.PositiveIntegerField(
+        verbose_name='Переходов по короткой ссылке',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_popular_idx'
+            ),
+        )
 
     def __str__(self):
         return f'Рецепт {self.name[:const.LENGTH_TEXT]} от {self.author}'
@@ -75,6 +116,11 @@ class RecipeTag(models.Model):
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецептов'
         ordering = ('tag', )
+        indexes = (
+            models.Index(
+                fields=('tag', 'recipe'), name='recipetag_tag_recipe_idx'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -127,6 +173,12 @@ class Follow(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('user', )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'following'),
+                name='unique_follow_user_following'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -146,6 +198,11 @@ class Favorite(models.Model):
         verbose_name = 'Лист избранного'
         verbose_name_plural = 'Листы избранного'
         ordering = ('user', )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_favorite_user_recipe'
+            ),
+        )
 
     def __str__(self):
         return (
@@ -165,8 +222,43 @@ class Shopping(models.Model):
         verbose_name = 'Лист покупок'
         verbose_name_plural = 'Листы покупок'
         ordering = ('user', )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_shopping_user_recipe'
+            ),
+        )
 
     def __str__(self):
         return (
             f'Лист покупок {self.user}'
         )
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика, раскладывается при публикации."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date', '-id')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_user_recipe'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='feed_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
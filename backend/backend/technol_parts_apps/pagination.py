@@ -0,0 +1,189 @@
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+import technol_parts_apps.constants as const
+
+
+class RecipePagination(PageNumberPagination):
+    """Постраничная выдача рецептов.
+
+    limit задаёт размер страницы (не больше MAX_PAGE_SIZE), count=false
+    отключает подсчёт общего числа рецептов, а параметр cursor включает
+    keyset-режим по (pub_date, id): следующая страница выбирается по
+    индексу, а не через OFFSET, и глубина прокрутки не влияет на цену.
+    С другой сортировкой (ordering или search) cursor игнорируется.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = const.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_ordering = ('-pub_date', '-id')
+    cursor_conflicting_params = ('ordering', 'search')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = 'page'
+        if (
+            self.cursor_query_param in request.query_params
+            and not any(
+                request.query_params.get(param)
+                for param in self.cursor_conflicting_params
+            )
+        ):
+            self.mode = 'cursor'
+            return self.paginate_by_cursor(queryset, request)
+        if request.query_params.get(
+            self.count_query_param, ''
+        ).lower() in ('false', '0'):
+            self.mode = 'no_count'
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_by_cursor(self, queryset, request):
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.cursor_ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            pub_date, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        offset = (self.parse_page_number(request) - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def paginate_positions(self, get_positions, request):
+        """Страница позиций (pub_date, pk) без COUNT.
+
+        get_positions(limit, before) возвращает первые limit позиций после
+        before, новые сверху; так страница собирается из нескольких
+        источников. Параметр cursor работает как в списке рецептов,
+        без него страница выбирается по номеру, как при count=false.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        offset, before = 0, None
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            cursor = request.query_params.get(self.cursor_query_param)
+            if cursor:
+                before = self.decode_cursor(cursor)
+        else:
+            self.mode = 'no_count'
+            offset = (self.parse_page_number(request) - 1) * page_size
+        results = get_positions(offset + page_size + 1, before)[offset:]
+        self.has_next = len(results) > page_size
+        self.results = results[:page_size]
+        return self.results
+
+    def parse_page_number(self, request):
+        page_number = request.query_params.get(self.page_query_param) or '1'
+        if not page_number.isdigit() or int(page_number) < 1:
+            raise NotFound('Неверная страница.')
+        self.page_number = int(page_number)
+        return self.page_number
+
+    def encode_cursor(self, recipe):
+        position = f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            pub_date, pk = base64.urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound('Неверный курсор.')
+        if pub_date is None:
+            raise NotFound('Неверный курсор.')
+        return pub_date, pk
+
+    def get_next_link(self):
+        if self.mode == 'page':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            return replace_query_param(
+                url, self.cursor_query_param,
+                self.encode_cursor(self.results[-1])
+            )
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.mode == 'page':
+            return super().get_previous_link()
+        if self.mode == 'cursor' or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator админки для больших таблиц.
+
+    Без фильтров на PostgreSQL число строк берётся из статистики
+    pg_class.reltuples вместо COUNT(*) по всей таблице, если оно больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD. Отфильтрованные списки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimate(queryset)
+            if estimate >= const.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return -1
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(queryset.model._meta.db_table)]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
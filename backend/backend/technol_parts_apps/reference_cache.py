@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag, urlencode
+from rest_framework.renderers import JSONRenderer
+
+import technol_parts_apps.constants as const
+from .caching import is_cache_shared
+
+
+def version_key(model):
+    return f'reference:{model._meta.label_lower}:version'
+
+
+def get_version(model):
+    key = version_key(model)
+    # Начальное значение от времени: если ключ версии вытеснят из кэша,
+    # старые ответы не совпадут с новой версией.
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(model):
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+class ReferenceCacheMixin:
+    """Кэширует готовые JSON ответы list/retrieve справочника.
+
+    Ключ включает версию модели, которую сигналы увеличивают при любом
+    изменении, поэтому устаревшие ответы просто перестают читаться.
+    Версия в локальном кэше процесса меняется только там, где изменили
+    данные (другой воркер, load_ingredients), поэтому без общего кэша
+    ответы живут REFERENCE_CACHE_LOCAL_TIMEOUT.
+
+    В ключ входят только id объекта и параметры из reference_query_params,
+    чтобы произвольные строки запроса не создавали новых записей.
+    """
+    reference_query_params = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, view_method, request, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return view_method(request, *args, **kwargs)
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if lookup is not None:
+            if not lookup.isdigit():
+                return view_method(request, *args, **kwargs)
+            lookup = int(lookup)
+        params = urlencode(sorted(
+            (name, request.query_params.getlist(name))
+            for name in self.reference_query_params
+            if name in request.query_params
+        ), doseq=True)
+        model = self.queryset.model
+        key = (
+            f'reference:{model._meta.label_lower}:{get_version(model)}:'
+            f'{self.action}:{lookup}:{params}'
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = view_method(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = JSONRenderer().render(response.data)
+            cached = (quote_etag(hashlib.sha1(body).hexdigest()), body)
+            cache.set(key, cached, timeout=(
+                const.REFERENCE_CACHE_TIMEOUT if is_cache_shared()
+                else const.REFERENCE_CACHE_LOCAL_TIMEOUT
+            ))
+        etag, body = cached
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,84 @@
+import time
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+import technol_parts_apps.constants as const
+from .caching import is_cache_shared
+from .models import Favorite, Follow, Shopping
+
+RELATIONS = (
+    ('favorites', Favorite, 'recipe_id'),
+    ('shopping_cart', Shopping, 'recipe_id'),
+    ('following', Follow, 'following_id'),
+)
+
+
+@dataclass(frozen=True)
+class UserRelations:
+    favorites: frozenset = frozenset()
+    shopping_cart: frozenset = frozenset()
+    following: frozenset = frozenset()
+
+
+EMPTY_RELATIONS = UserRelations()
+
+
+def version_key(user_id):
+    return f'relations:{user_id}:version'
+
+
+def get_user_version(user_id):
+    key = version_key(user_id)
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_user_relations(user_id):
+    """Вызывается после добавления или удаления избранного, покупок и
+    подписок пользователя: старые наборы id перестают читаться."""
+    key = version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def query_user_relations(user_id):
+    return {
+        name: tuple(sorted(model.objects.filter(
+            user_id=user_id
+        ).order_by().values_list(field, flat=True)))
+        for name, model, field in RELATIONS
+    }
+
+
+def load_user_relations(user_id):
+    """id избранного, списка покупок и подписок - по запросу на связь.
+
+    С общим кэшем наборы лежат в нём отсортированными кортежами под ключом
+    с версией пользователя. С локальным кэшем процесса версию увеличил бы
+    только обработавший изменение воркер, поэтому наборы читаются из БД
+    на каждый запрос.
+    """
+    if not is_cache_shared():
+        ids = query_user_relations(user_id)
+    else:
+        key = f'relations:{user_id}:{get_user_version(user_id)}'
+        ids = cache.get(key)
+        if ids is None:
+            ids = query_user_relations(user_id)
+            cache.set(key, ids, const.USER_RELATIONS_TIMEOUT)
+    return UserRelations(**{name: frozenset(ids[name]) for name in ids})
+
+
+def get_user_relations(request):
+    """Наборы связей текущего пользователя, один раз за запрос."""
+    if request is None or not request.user.is_authenticated:
+        return EMPTY_RELATIONS
+    relations = getattr(request, 'user_relations', None)
+    if relations is None:
+        relations = request.user_relations = load_user_relations(
+            request.user.pk
+        )
+    return relations
@@ -0,0 +1,91 @@
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+import technol_parts_apps.constants as const
+from .models import Recipe, RecipeIngredient
+
+pending = threading.local()
+
+
+def is_full_text_available():
+    return connection.vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    """Название (A), описание (B) и названия ингредиентов (C)."""
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=const.SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=const.SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(ingredient_names, Value('')),
+            weight='C', config=const.SEARCH_CONFIG
+        )
+    )
+
+
+def update_search_vectors(queryset):
+    """Пересчитывает search_vector одним UPDATE, вне PostgreSQL - no-op."""
+    if not is_full_text_available():
+        return 0
+    return queryset.update(search_vector=recipe_search_vector())
+
+
+def schedule_search_vector_update(recipe_id):
+    """Пересчёт search_vector рецепта после коммита транзакции.
+
+    Рецепты, изменённые в транзакции (сам рецепт, строки ингредиентов),
+    обновляются одним UPDATE в первом сработавшем on_commit, остальные
+    находят набор пустым.
+    """
+    if not is_full_text_available():
+        return
+    recipe_ids = getattr(pending, 'recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = pending.recipe_ids = set()
+    recipe_ids.add(recipe_id)
+    transaction.on_commit(flush_search_vectors)
+
+
+def flush_search_vectors():
+    recipe_ids = getattr(pending, 'recipe_ids', None)
+    if not recipe_ids:
+        return 0
+    pending.recipe_ids = set()
+    return update_search_vectors(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+def search_recipes(queryset, text):
+    """Полнотекстовый поиск с сортировкой по SearchRank.
+
+    Без PostgreSQL - поиск подстроки в названии, описании и ингредиентах.
+    """
+    if not is_full_text_available():
+        return queryset.filter(
+            Q(name__icontains=text)
+            | Q(description__icontains=text)
+            | Exists(RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk'), ingredient__name__icontains=text
+            ))
+        ).order_by('-pub_date', '-id')
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    query = SearchQuery(
+        text, config=const.SEARCH_CONFIG, search_type='websearch'
+    )
+    return queryset.filter(search_vector__matches=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by('-search_rank', '-pub_date', '-id')
@@ -1,18 +1,119 @@
-import base64
-
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
 
 import technol_parts_apps.constants as const
 import technol_parts_apps.models as md
 import technol_parts_apps.validators as vd
+from technol_parts_apps.counters import change_recipe_counter
+from technol_parts_apps.images import Base64ImageField, ThumbnailImageField
+from technol_parts_apps.relations import get_user_relations
+from technol_parts_apps.short_links import encode_id
 from users.serializers import RetrieveUserSerializer
 
 User = get_user_model()
 
 
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Связь по id, которая для списка проверяет все id одним in_bulk.
+
+    С many=True объекты загружаются разом, отсутствующие id возвращаются
+    одной ошибкой. С defer=True поле отдаёт только id, а объекты
+    загружает BulkListSerializer вложенного списка.
+    """
+
+    def __init__(self, **kwargs):
+        self.defer = kwargs.pop('defer', False)
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if self.defer:
+            return self.to_pk(data)
+        return super().to_internal_value(data)
+
+    def to_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """Объекты по списку id в том же порядке."""
+        objects = self.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in objects]
+        if missing:
+            raise serializers.ValidationError([
+                self.error_messages['does_not_exist'].format(pk_value=pk)
+                for pk in missing
+            ])
+        return [objects[pk] for pk in pks]
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.resolve(
+            [self.child_relation.to_pk(item) for item in data]
+        )
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Загружает объекты отложенных BulkPrimaryKeyRelatedField всех
+    элементов списка одним in_bulk на поле."""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        self.check_required(items)
+        for name, field in self.child.fields.items():
+            if not isinstance(field, BulkPrimaryKeyRelatedField):
+                continue
+            if not field.defer or field.read_only:
+                continue
+            source = field.source
+            objects = field.resolve([item[source] for item in items])
+            for item, obj in zip(items, objects):
+                item[source] = obj
+        return items
+
+    def check_required(self, items):
+        """Элементы списка заменяются целиком, поэтому и при partial у
+        каждого должны быть все обязательные поля."""
+        required = [
+            (name, field) for name, field in self.child.fields.items()
+            if field.required and not field.read_only
+        ]
+        errors = [
+            {
+                name: [field.error_messages['required']]
+                for name, field in required if field.source not in item
+            }
+            for item in items
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+
 class TagSerializers(serializers.ModelSerializer):
 
     class Meta:
@@ -28,36 +129,31 @@ class IngredientSerializers(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='image.' + ext)
-
-        return super().to_internal_value(data)
-
-
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=md.Ingredient.objects.all(),
+        defer=True,
     )
     amount = serializers.IntegerField(
         validators=vd.amount_validators,
-        write_only=True
     )
 
     class Meta:
         model = md.Ingredient
         fields = ('id', 'amount', )
+        list_serializer_class = BulkListSerializer
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation.pop('id')
-        ingredient_serializer = IngredientSerializers(instance=instance)
-        representation.update(ingredient_serializer.data)
-        representation['amount'] = instance.ingredient_recipes.last().amount
-        return representation
+
+class RecipeIngredientReadSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = md.RecipeIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount', )
 
 
 class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
@@ -72,11 +168,14 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         source='description',
         max_length=const.TEXT_LENGTH,
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=md.Tag.objects.all(),
         many=True,
+        write_only=True,
     )
-    ingredients = RecipeIngredientSerializer(many=True)
+    ingredients = RecipeIngredientSerializer(many=True, write_only=True)
+
+    recipe_created = False
 
     class Meta:
         model = md.Recipe
@@ -110,6 +209,7 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         self.exam_duplicate(exam_duplicate_ingredients, 'ingredients')
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
         tags = validated_data.pop('tags')
@@ -127,12 +227,16 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
             for values in ingredients
         ]
         md.RecipeIngredient.objects.bulk_create(recipe_ingredient_objects)
+        self.recipe_created = True
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.image = validated_data.get('image', instance.image)
         instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text')
+        instance.description = validated_data.get(
+            'description', instance.description
+        )
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
@@ -140,32 +244,69 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         instance.save()
         instance.tags.set(tags)
-        for values in ingredients:
-            ingredient, *_ = md.RecipeIngredient.objects.get_or_create(
-                ingredient=values['id'],
-                recipe=instance,
-            )
-            ingredient.amount = values['amount']
-            ingredient.save()
+        self.update_ingredients(instance, ingredients)
         return instance
 
+    def update_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к переданным тремя запросами."""
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipes_ingredient.all()
+        }
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for values in ingredients:
+            recipe_ingredient = existing.pop(values['id'].id, None)
+            if recipe_ingredient is None:
+                to_create.append(md.RecipeIngredient(
+                    ingredient=values['id'],
+                    recipe=recipe,
+                    amount=values['amount']
+                ))
+            elif recipe_ingredient.amount != values['amount']:
+                recipe_ingredient.amount = values['amount']
+                recipe_ingredient.date = now
+                to_update.append(recipe_ingredient)
+        if existing:
+            md.RecipeIngredient.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        md.RecipeIngredient.objects.bulk_update(to_update, ('amount', 'date'))
+        md.RecipeIngredient.objects.bulk_create(to_create)
+
     def to_representation(self, instance):
+        """Ответ собирается из проверенных данных запроса без чтения БД."""
+        request = self.context['request']
         representation = super().to_representation(instance)
-        user = self.context['request'].user
-        recipe = int(representation['id'])
-
-        tags = representation.pop('tags')
-        tags_objects = md.Tag.objects.filter(id__in=tags)
-        tags_objects_serializer = TagSerializers(tags_objects, many=True)
-        representation['tags'] = tags_objects_serializer.data
-
-        author = RetrieveUserSerializer(instance=user)
-        representation['author'] = author.data
-        representation['is_favorited'] = self.already(
-            user, recipe, md.Favorite
-        )
-        representation['is_in_shopping_cart'] = self.already(
-            user, recipe, md.Shopping
+        representation['tags'] = TagSerializers(
+            sorted(self.validated_data['tags'], key=lambda tag: tag.name),
+            many=True
+        ).data
+        representation['ingredients'] = RecipeIngredientReadSerializer(
+            sorted(
+                (
+                    md.RecipeIngredient(
+                        ingredient=values['id'], amount=values['amount']
+                    )
+                    for values in self.validated_data['ingredients']
+                ),
+                key=lambda item: item.ingredient.name
+            ),
+            many=True
+        ).data
+        representation['author'] = RetrieveUserSerializer(
+            instance=request.user, context=self.context
+        ).data
+        if self.recipe_created:
+            # Новый рецепт ещё не может быть в избранном и покупках.
+            representation['is_favorited'] = False
+            representation['is_in_shopping_cart'] = False
+            return representation
+        relations = get_user_relations(request)
+        representation['is_favorited'] = instance.pk in relations.favorites
+        representation['is_in_shopping_cart'] = (
+            instance.pk in relations.shopping_cart
         )
         return representation
 
@@ -175,9 +316,6 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
                 f'Поле {f_string} содержит повторяющиеся элементы'
             )
 
-    def already(self, user, recipe, model):
-        return model.objects.filter(user=user, recipe=recipe).exists()
-
     def tags_recipes_objects(self, list_tags, recipe):
         tag_recipes_objects = [
             md.RecipeTag(recipe=recipe, tag=tag)
@@ -187,9 +325,13 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
 
 
 class GetRecipeSerializer(serializers.ModelSerializer):
+    """Чтение рецепта, флаги пользователя - из наборов relations."""
     tags = TagSerializers(many=True)
     author = RetrieveUserSerializer()
-    ingredients = IngredientSerializers(many=True)
+    ingredients = RecipeIngredientReadSerializer(
+        source='recipes_ingredient', many=True
+    )
+    image = ThumbnailImageField(size='medium')
     text = serializers.CharField(source='description')
 
     class Meta:
@@ -205,48 +347,37 @@ class GetRecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        for ingredient in representation['ingredients']:
-            ingredient['amount'] = md.RecipeIngredient.objects.get(
-                recipe__id=instance.id,
-                ingredient__id=int(ingredient['id'])).amount
-        if self.context['request'].auth:
-            user = self.context['request'].user
-            representation['author'][
-                'is_subscribed'
-            ] = user.follower.filter(
-                following__exact=int(representation['author']['id'])
-            ).exists()
-            representation["is_favorited"] = user.favourites.filter(
-                recipe__exact=instance
-            ).exists()
-            representation["is_in_shopping_cart"] = user.shoppings.filter(
-                recipe__exact=instance
-            ).exists()
-            return representation
-
-        representation["is_favorited"] = False
-        representation["is_in_shopping_cart"] = False
+        relations = get_user_relations(self.context.get('request'))
+        representation['author']['is_subscribed'] = (
+            instance.author_id in relations.following
+        )
+        representation['is_favorited'] = instance.pk in relations.favorites
+        representation['is_in_shopping_cart'] = (
+            instance.pk in relations.shopping_cart
+        )
         return representation
 
 
 class GetLinkSerializer(serializers.ModelSerializer):
-    id = serializers.HyperlinkedRelatedField(
-        read_only=True,
-        view_name='recipes-detail',
-        lookup_url_kwarg='pk',
-    )
+    short_link = serializers.SerializerMethodField()
 
     class Meta:
         model = md.Recipe
-        fields = ('id', )
+        fields = ('short_link', )
+
+    def get_short_link(self, instance):
+        return self.context['request'].build_absolute_uri(
+            reverse('short-link', args=(encode_id(instance.pk),))
+        )
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['short-link'] = representation.pop('id')
+        representation['short-link'] = representation.pop('short_link')
         return representation
 
 
 class RecipeForListFollowSerializer(serializers.ModelSerializer):
+    image = ThumbnailImageField(size='small')
 
     class Meta:
         model = md.Recipe
@@ -254,6 +385,23 @@ class RecipeForListFollowSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
+def create_unique_relation(model, message, **fields):
+    """Вставка связи, повтор отсекается уникальным ограничением БД."""
+    try:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    except IntegrityError:
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+        )
+
+
+def parse_recipes_limit(recipes_limit):
+    if recipes_limit and str(recipes_limit).isdigit():
+        return int(recipes_limit)
+    return None
+
+
 class FollowSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -266,89 +414,67 @@ class FollowSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        if self.context.get("pk"):
-            user = self.context['request'].user
-            pk = self.context["pk"]
-            following = get_object_or_404(User, pk=pk)
-            if user.follower.filter(
-                following__exact=following
-            ).exists():
-                raise serializers.ValidationError(
-                    'Вы уже подписаны на этого пользователя'
-                )
-            if following == user:
-                raise serializers.ValidationError(
-                    'Нельзя подписаться на себя (даже если очень хочется).'
-                )
-            data['email'] = following.email
-            data['id'] = following.id
-            data['username'] = following.username
-            data['first_name'] = following.first_name
-            data['last_name'] = following.last_name
-            data['avatar'] = following.avatar
+        if self.context.get('following') == self.context['request'].user:
+            raise serializers.ValidationError(
+                'Нельзя подписаться на себя (даже если очень хочется).'
+            )
         return data
 
     def create(self, validated_data):
-        instance = md.Follow.objects.create(
+        following = self.context['following']
+        create_unique_relation(
+            md.Follow,
+            'Вы уже подписаны на этого пользователя',
             user=self.context['request'].user,
-            following=User.objects.get(pk=self.context["pk"])
+            following=following
         )
-        return instance
+        return following
 
-    def get_all_recipes(self, data):
-        serializer = RecipeForListFollowSerializer(data, many=True)
-        if self.context["recipes_limit"]:
-            return serializer.data[:int(self.context["recipes_limit"])]
-        return serializer.data
+    def get_all_recipes(self, instance):
+        recipes = getattr(instance, 'limited_recipes', None)
+        if recipes is None:
+            recipes = instance.recipes.all()[
+                :parse_recipes_limit(self.context.get('recipes_limit'))
+            ]
+        return RecipeForListFollowSerializer(recipes, many=True).data
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        user = self.context['request'].user
-        following = User.objects.get(pk=int(representation['id']))
-        representation['is_subscribed'] = user.follower.filter(
-            following__exact=following
-        ).exists()
-        representation['recipes_count'] = following.recipes.count()
-        representation['recipes'] = self.get_all_recipes(
-            data=following.recipes.all()
-        )
+        # Сериализатор отдаёт только авторов, на которых подписан
+        # текущий пользователь.
+        representation['is_subscribed'] = True
+        recipes_count = getattr(instance, 'recipes_count', None)
+        if recipes_count is None:
+            recipes_count = instance.recipes.count()
+        representation['recipes_count'] = recipes_count
+        representation['recipes'] = self.get_all_recipes(instance)
         return representation
 
 
 class BaseFavoriteShoppingSerializer(serializers.Serializer):
+    model = None
+    counter_field = None
+
+    @transaction.atomic
+    def create(self, validated_data):
+        instance = create_unique_relation(
+            self.model,
+            'Вы уже добавили этот рецепт',
+            user=self.context['request'].user,
+            recipe=self.context['recipe']
+        )
+        change_recipe_counter(instance.recipe_id, self.counter_field, 1)
+        return instance
 
     def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        if self.context.get('pk'):
-            recipe = get_object_or_404(md.Recipe, pk=self.context["pk"])
-            recipe_serializer = RecipeForListFollowSerializer(recipe)
-            representation.update(recipe_serializer.data)
-        return representation
+        return RecipeForListFollowSerializer(instance.recipe).data
 
 
 class FavoriteSerializer(BaseFavoriteShoppingSerializer):
-
-    def validate(self, data):
-        data = super().validate(data)
-        if self.context.get('pk'):
-            user = self.context['request'].user
-            recipe = get_object_or_404(md.Recipe, pk=self.context["pk"])
-            if user.favourites.filter(recipe__exact=recipe).exists():
-                raise serializers.ValidationError(
-                    'Вы уже добавили этот рецепт'
-                )
-        return data
+    model = md.Favorite
+    counter_field = 'favorites_count'
 
 
 class ShoppingSerializer(BaseFavoriteShoppingSerializer):
-
-    def validate(self, data):
-        data = super().validate(data)
-        if self.context.get('pk'):
-            user = self.context['request'].user
-            recipe = get_object_or_404(md.Recipe, pk=self.context["pk"])
-            if user.shoppings.filter(recipe__exact=recipe).exists():
-                raise serializers.ValidationError(
-                    'Вы уже добавили этот рецепт'
-                )
-        return data
+    model = md.Shopping
+    counter_field = 'shopping_cart_count'
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from django.db.models import Sum
+
+from .models import RecipeIngredient
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: отдаёт строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_cart_totals(user):
+    """Суммы ингредиентов списка покупок одним GROUP BY запросом."""
+    return RecipeIngredient.objects.filter(
+        recipe__recipe_shops__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by('ingredient__name')
+
+
+def render_txt(rows):
+    for row in rows:
+        yield (
+            f'{row["ingredient__name"]}: {row["total"]} '
+            f'{row["ingredient__measurement_unit"]}\n'
+        )
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow((
+            row['ingredient__name'],
+            row['total'],
+            row['ingredient__measurement_unit'],
+        ))
+
+
+def render_json(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(
+            {
+                'name': row['ingredient__name'],
+                'amount': row['total'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+            },
+            ensure_ascii=False
+        )
+        separator = ', '
+    yield ']'
+
+
+SHOPPING_CART_RENDERERS = {
+    'txt': (render_txt, 'text/plain'),
+    'csv': (render_csv, 'text/csv'),
+    'json': (render_json, 'application/json'),
+}
@@ -0,0 +1,123 @@
+import atexit
+import logging
+import string
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+import technol_parts_apps.constants as const
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+# Наибольший id рецепта (BigAutoField); 11 символов base62 дают больше.
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_id(number):
+    """id рецепта в base62."""
+    code = ''
+    while True:
+        number, remainder = divmod(number, BASE)
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+def decode_code(code):
+    if not code or len(code) > const.SHORT_LINK_MAX_LENGTH:
+        return None
+    number = 0
+    for char in code:
+        index = ALPHABET.find(char)
+        if index < 0:
+            return None
+        number = number * BASE + index
+    if number > MAX_ID:
+        return None
+    return number
+
+
+class RecipeLinkCache:
+    """LRU существующих рецептов в памяти процесса перед запросом в БД."""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.recipe_ids = OrderedDict()
+
+    def exists(self, recipe_id):
+        with self.lock:
+            if recipe_id in self.recipe_ids:
+                self.recipe_ids.move_to_end(recipe_id)
+                return True
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            return False
+        with self.lock:
+            self.recipe_ids[recipe_id] = None
+            if len(self.recipe_ids) > self.size:
+                self.recipe_ids.popitem(last=False)
+        return True
+
+    def discard(self, recipe_id):
+        with self.lock:
+            self.recipe_ids.pop(recipe_id, None)
+
+
+class HitCounter:
+    """Переходы копятся в памяти и сбрасываются в БД фоновым потоком.
+
+    Рецепты с одинаковым приростом обновляются одним UPDATE через F().
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.thread = None
+        self.stopped = threading.Event()
+        atexit.register(self.stop)
+
+    def hit(self, recipe_id):
+        with self.lock:
+            self.hits[recipe_id] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='short-link-hits', daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception('Не удалось сохранить переходы по ссылкам')
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+        if not hits:
+            return
+        by_delta = defaultdict(list)
+        for recipe_id, delta in hits.items():
+            by_delta[delta].append(recipe_id)
+        with transaction.atomic():
+            for delta, recipe_ids in by_delta.items():
+                Recipe.objects.filter(pk__in=recipe_ids).update(
+                    short_link_hits=F('short_link_hits') + delta
+                )
+
+    def stop(self):
+        self.stopped.set()
+        self.flush()
+
+
+recipe_link_cache = RecipeLinkCache(const.SHORT_LINK_CACHE_SIZE)
+hit_counter = HitCounter(const.SHORT_LINK_FLUSH_INTERVAL)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .counters import change_followers_counter
+from .feed import backfill_feed, fan_out_recipe, remove_author_from_feed
+from .images import schedule_image
+from .models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+from .reference_cache import bump_version
+from .search import schedule_search_vector_update, update_search_vectors
+from .short_links import recipe_link_cache
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def bump_reference_version(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(post_save, sender=Ingredient)
+def update_recipes_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(Recipe.objects.filter(
+            recipes_ingredient__ingredient=instance
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, update_fields=None,
+                                **kwargs):
+    if update_fields is None or {'name', 'description'} & set(update_fields):
+        schedule_search_vector_update(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_ingredients_search_vector(sender, instance, **kwargs):
+    if instance.recipe_id is not None:
+        schedule_search_vector_update(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out_recipe(instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    recipe_link_cache.discard(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    if created:
+        change_followers_counter(instance.following_id, 1)
+        backfill_feed(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed_after_unfollow(sender, instance, **kwargs):
+    change_followers_counter(instance.following_id, -1)
+    remove_author_from_feed(instance.user_id, instance.following_id)
+
+
+def image_after_save(field_name, ready_field=None):
+    """Публикация новой загрузки и, при ready_field, уменьшенные копии."""
+    def handler(sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        image = getattr(instance, field_name)
+        if not image:
+            return
+        uploaded, image.pending = image.pending, False
+        if not uploaded and (
+            ready_field is None
+            or getattr(instance, ready_field) == image.name
+        ):
+            return
+        name = image.name
+        transaction.on_commit(lambda: schedule_image(
+            sender, field_name, name, ready_field
+        ))
+    return handler
+
+
+post_save.connect(
+    image_after_save('image', 'thumbnails_source'), sender=Recipe,
+    weak=False, dispatch_uid='recipe_image_thumbnails'
+)
+post_save.connect(
+    image_after_save('avatar'), sender=User, weak=False,
+    dispatch_uid='user_avatar_publish'
+)
@@ -0,0 +1,406 @@
+import io
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+import technol_parts_apps.constants as const
+import technol_parts_apps.models as md
+from technol_parts_apps.management.commands import load_ingredients
+from technol_parts_apps.short_links import MAX_ID, decode_code, encode_id
+
+User = get_user_model()
+
+RECIPES = 30
+PAGE_SIZES = (1, 6, 24)
+
+# COUNT, рецепты с авторами, теги, ингредиенты.
+LIST_QUERIES = 4
+# Рецепт с автором, теги, ингредиенты.
+DETAIL_QUERIES = 3
+# Токен и три набора связей пользователя.
+USER_QUERIES = 4
+
+
+class RecipeQueryCountTests(APITestCase):
+    """Число запросов к БД для рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, author = (
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='Passw0rd!', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(2)
+        )
+        tags = [
+            md.Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            md.Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(10)
+        ]
+        recipes = [
+            md.Recipe.objects.create(
+                author=(cls.user, author)[number % 2],
+                name=f'Рецепт {number}',
+                image='recipes/image.png',
+                description='Описание',
+                cooking_time=10,
+            )
+            for number in range(RECIPES)
+        ]
+        md.RecipeTag.objects.bulk_create(
+            md.RecipeTag(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags
+        )
+        md.RecipeIngredient.objects.bulk_create(
+            md.RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes for ingredient in ingredients
+        )
+        md.Favorite.objects.bulk_create(
+            md.Favorite(user=cls.user, recipe=recipe)
+            for recipe in recipes[::2]
+        )
+        md.Shopping.objects.bulk_create(
+            md.Shopping(user=cls.user, recipe=recipe)
+            for recipe in recipes[::3]
+        )
+        md.Follow.objects.create(user=cls.user, following=author)
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = recipes[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_list(self, page_size, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(
+                '/api/recipes/', {'limit': page_size}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return response
+
+    def test_list_anonymous(self):
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size):
+                self.get_list(page_size, LIST_QUERIES)
+
+    def test_list_authenticated(self):
+        self.authenticate()
+        for page_size in PAGE_SIZES:
+            with self.subTest(page_size=page_size):
+                response = self.get_list(
+                    page_size, LIST_QUERIES + USER_QUERIES
+                )
+                recipe = response.data['results'][0]
+                self.assertIn('is_favorited', recipe)
+                self.assertIn('is_subscribed', recipe['author'])
+
+    def test_list_authenticated_shared_cache(self):
+        """С общим кэшем наборы связей читаются из него: токен + список."""
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+        ):
+            self.authenticate()
+            self.get_list(PAGE_SIZES[0], LIST_QUERIES + USER_QUERIES)
+            for page_size in PAGE_SIZES:
+                with self.subTest(page_size=page_size):
+                    self.get_list(page_size, LIST_QUERIES + 1)
+
+    def test_detail(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        with self.assertNumQueries(DETAIL_QUERIES):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.authenticate()
+        with self.assertNumQueries(DETAIL_QUERIES + USER_QUERIES):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class FeedPullAuthorTests(APITestCase):
+    """Лента с автором, у которого подписчиков больше FEED_FANOUT_LIMIT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, author, star, fan = (
+            User.objects.create_user(
+                username=f'feed{number}', email=f'feed{number}@example.com',
+                password='Passw0rd!', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(4)
+        )
+        now = timezone.now()
+        for number in range(7):
+            for recipe_author in (author, star):
+                md.Recipe.objects.create(
+                    author=recipe_author,
+                    name=f'{recipe_author.username} {number}',
+                    description='Описание',
+                    cooking_time=10,
+                    pub_date=now - timedelta(minutes=number),
+                )
+        with mock.patch.object(const, 'FEED_FANOUT_LIMIT', 1):
+            md.Follow.objects.create(user=cls.user, following=author)
+            # Пока подписчик один, рецепты star попадают в FeedEntry.
+            md.Follow.objects.create(user=cls.user, following=star)
+            md.Follow.objects.create(user=fan, following=star)
+        cls.star = star
+        cls.expected = list(md.Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('name', flat=True))
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        patcher = mock.patch.object(const, 'FEED_FANOUT_LIMIT', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_feed(self, params):
+        names = []
+        url, params = '/api/recipes/feed/', {'limit': 4, **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            names += [recipe['name'] for recipe in response.data['results']]
+            url, params = response.data['next'], None
+        return names
+
+    def test_followers_count(self):
+        self.star.refresh_from_db()
+        self.assertEqual(self.star.followers_count, 2)
+        md.Follow.objects.filter(following=self.star).delete()
+        self.star.refresh_from_db()
+        self.assertEqual(self.star.followers_count, 0)
+
+    def test_pages(self):
+        self.assertEqual(self.read_feed({}), self.expected)
+
+    def test_cursor(self):
+        self.assertEqual(self.read_feed({'cursor': ''}), self.expected)
+
+
+class LoadIngredientsJsonTests(SimpleTestCase):
+    """Разбор JSON в load_ingredients кусками по несколько символов."""
+
+    def setUp(self):
+        patcher = mock.patch.object(load_ingredients, 'JSON_READ_SIZE', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, text):
+        return list(load_ingredients.iter_json(io.StringIO(text)))
+
+    def test_valid(self):
+        self.assertEqual(self.read(
+            ' [ {"name": "соль", "measurement_unit": "г"} ,\n'
+            '{"name": "вода", "measurement_unit": "мл"}]\n'
+        ), [('соль', 'г'), ('вода', 'мл')])
+        self.assertEqual(self.read('[]'), [])
+
+    def test_malformed(self):
+        item = '{"name": "соль", "measurement_unit": "г"}'
+        for text in (
+            f'{item}',
+            f'[{item}{item}]',
+            f'[,,{item}]',
+            f'[{item},,{item}]',
+            f'[{item},]',
+            f'[{item}]garbage',
+            f'[{item}],',
+            f'[{item}][]',
+            f'[{item},',
+            f'[{item}',
+            '[1]',
+            '',
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(CommandError):
+                    self.read(text)
+
+
+class RecipeWriteTests(APITestCase):
+    """Проверка связей и обновление ингредиентов при PATCH рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='writer', email='writer@example.com',
+            password='Passw0rd!', first_name='Имя', last_name='Фамилия'
+        )
+        cls.tags = [
+            md.Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(2)
+        ]
+        cls.ingredients = [
+            md.Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(60)
+        ]
+        cls.recipe = md.Recipe.objects.create(
+            author=cls.user,
+            name='Рецепт',
+            image='recipes/image.png',
+            description='Описание',
+            cooking_time=10,
+        )
+        cls.recipe.tags.set(cls.tags)
+        md.RecipeIngredient.objects.bulk_create(
+            md.RecipeIngredient(
+                recipe=cls.recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in zip(cls.ingredients, (1, 2, 3))
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.url = f'/api/recipes/{cls.recipe.pk}/'
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def patch(self, ingredients, tags=None):
+        return self.client.patch(self.url, {
+            'tags': [tag.pk for tag in self.tags] if tags is None else tags,
+            'ingredients': ingredients,
+        }, format='json')
+
+    def recipe_amounts(self):
+        return dict(self.recipe.recipes_ingredient.values_list(
+            'ingredient_id', 'amount'
+        ))
+
+    def test_missing_ids_reported_at_once(self):
+        missing = (10_001, 10_002, 10_003)
+        response = self.patch(
+            [{'id': self.ingredients[0].pk, 'amount': 1}]
+            + [{'id': pk, 'amount': 1} for pk in missing],
+            tags=[self.tags[0].pk, *missing],
+        )
+        self.assertEqual(response.status_code, 400)
+        for field in ('ingredients', 'tags'):
+            errors = ' '.join(map(str, response.data[field]))
+            for pk in missing:
+                with self.subTest(field=field, pk=pk):
+                    self.assertIn(str(pk), errors)
+
+    def test_items_without_required_fields(self):
+        first = self.ingredients[0].pk
+        for item, field in (({'amount': 5}, 'id'), ({'id': first}, 'amount')):
+            with self.subTest(item=item):
+                response = self.patch([{'id': first, 'amount': 1}, item])
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['ingredients'][0], {})
+                self.assertIn(field, response.data['ingredients'][1])
+        self.assertEqual(len(self.recipe_amounts()), 3)
+
+    def test_update_ingredients(self):
+        removed, changed, kept, added = self.ingredients[:4]
+        kept_row = self.recipe.recipes_ingredient.get(ingredient=kept)
+        response = self.patch([
+            {'id': changed.pk, 'amount': 20},
+            {'id': kept.pk, 'amount': 3},
+            {'id': added.pk, 'amount': 4},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.recipe_amounts(),
+            {changed.pk: 20, kept.pk: 3, added.pk: 4}
+        )
+        self.assertNotIn(removed.pk, self.recipe_amounts())
+        self.assertTrue(md.RecipeIngredient.objects.filter(
+            pk=kept_row.pk, amount=3
+        ).exists())
+
+    def test_update_query_count_constant(self):
+        """Каждый PATCH меняет количество общего ингредиента, удаляет
+        прежние строки и добавляет новые; число запросов от их числа не
+        зависит."""
+        shared = self.ingredients[0]
+        start = 3
+        counts = []
+        for size in (2, 10, 25):
+            added = self.ingredients[start:start + size - 1]
+            start += size - 1
+            with CaptureQueriesContext(connection) as queries:
+                response = self.patch([
+                    {'id': ingredient.pk, 'amount': size}
+                    for ingredient in (shared, *added)
+                ])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(self.recipe_amounts()), size)
+            counts.append(len(queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+
+class ShortLinkTests(APITestCase):
+    """Короткие ссылки на рецепты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='linker', email='linker@example.com',
+            password='Passw0rd!', first_name='Имя', last_name='Фамилия'
+        )
+        cls.recipe = md.Recipe.objects.create(
+            author=author,
+            name='Рецепт',
+            image='recipes/image.png',
+            description='Описание',
+            cooking_time=10,
+        )
+
+    def test_round_trip(self):
+        for number in (0, 1, 61, 62, 10 ** 9, MAX_ID):
+            with self.subTest(number=number):
+                self.assertEqual(decode_code(encode_id(number)), number)
+
+    @mock.patch('technol_parts_apps.views.hit_counter')
+    def test_redirect(self, hit_counter):
+        response = self.client.get(
+            f'/api/recipes/{self.recipe.pk}/get-link/'
+        )
+        self.assertEqual(response.status_code, 200)
+        code = encode_id(self.recipe.pk)
+        self.assertTrue(response.data['short-link'].endswith(f'/s/{code}'))
+        response = self.client.get(f'/s/{code}')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], f'/recipes/{self.recipe.pk}')
+        hit_counter.hit.assert_called_once_with(self.recipe.pk)
+
+    @mock.patch('technol_parts_apps.views.hit_counter')
+    def test_out_of_range_codes(self, hit_counter):
+        for code in (
+            encode_id(MAX_ID + 1),
+            'z' * const.SHORT_LINK_MAX_LENGTH,
+            '1' * (const.SHORT_LINK_MAX_LENGTH + 1),
+            encode_id(self.recipe.pk + 1000),
+            'abc-',
+        ):
+            with self.subTest(code=code):
+                response = self.client.get(f'/s/{code}')
+                self.assertEqual(response.status_code, 404)
+        hit_counter.hit.assert_not_called()
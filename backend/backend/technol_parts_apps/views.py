@@ -1,19 +1,33 @@
-from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+import technol_parts_apps.constants as const
 import technol_parts_apps.serializers as s
-from .models import Favorite, Ingredient, Recipe, Shopping, Tag
+from .autocomplete import ingredient_index
+from .counters import change_recipe_counter
+from .feed import get_feed_positions, get_pulled_author_ids
+from .filters import RecipeFilter
+from .instrumentation import InstrumentedViewMixin
+from .models import FeedEntry, Ingredient, Recipe, RecipeIngredient, Tag
+from .pagination import RecipePagination
 from .permissions import IsAuthorAuthenticated
+from .reference_cache import ReferenceCacheMixin
+from .relations import bump_user_relations
+from .shopping_cart import SHOPPING_CART_RENDERERS, get_shopping_cart_totals
+from .short_links import decode_code, hit_counter, recipe_link_cache
 
 
 class BaseTagIngredientViewSet(
+    InstrumentedViewMixin,
+    ReferenceCacheMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
@@ -30,68 +44,39 @@ class TagViewSet(BaseTagIngredientViewSet):
 class Ingredient(BaseTagIngredientViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = s.IngredientSerializers
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('^name',)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get(api_settings.SEARCH_PARAM)
+        if name:
+            return Response(
+                ingredient_index.search(name, const.INGREDIENT_SEARCH_LIMIT)
+            )
+        return super().list(request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Создание манипуляционного инструмента для рецепта"""
     http_method_names = ['post', 'get', 'patch', 'delete']
     filter_backends = (DjangoFilterBackend,)
-    filterset_fields = ('author', )
-
-    def get_page_count(self, limit):
-        class PageNumberLimitPagination(PageNumberPagination):
-            page_size = int(limit)
-
-        self.pagination_class = PageNumberLimitPagination
-
-    def get_queryset(self):
-        is_favorited = self.request.query_params.get('is_favorited')
-        is_in_shopping_cart = self.request.query_params.get(
-            'is_in_shopping_cart'
+    filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_recipes(self):
+        """Рецепты со связями, флаги пользователя берутся из relations."""
+        return Recipe.objects.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipes_ingredient',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('ingredient__name')
+            ),
         )
-        limit = self.request.query_params.get('limit')
 
-        if self.request.query_params.get('tags'):
-            tags_obj = Tag.objects.filter(
-                slug__in=self.request.query_params.getlist('tags')
-            )
-            recipes_tags_queryset = Recipe.objects.filter(
-                tags__in=tags_obj
-            ).distinct()
-
-        if is_favorited and is_favorited.isdigit() and self.request.auth:
-            filter_is_favorited = [
-                item.recipe.id
-                for item in self.request.user.favourites.all()
-            ]
-            if self.request.query_params.get('tags'):
-                return recipes_tags_queryset.filter(
-                    id__in=filter_is_favorited
-                )[:int(is_favorited)]
-            return Recipe.objects.filter(
-                id__in=filter_is_favorited
-            )[:int(is_favorited)]
-        if (
-            is_in_shopping_cart
-            and is_in_shopping_cart.isdigit()
-            and self.request.auth
-        ):
-            filter_is_in_shopping_cart = [
-                item.recipe.id for
-                item in self.request.user.shoppings.all()
-            ]
-            return Recipe.objects.filter(
-                id__in=filter_is_in_shopping_cart
-            )[:int(is_in_shopping_cart)]
-
-        if limit and limit.isdigit():
-            self.get_page_count(limit)
-
-        if self.request.query_params.get('tags'):
-            return recipes_tags_queryset
-        return Recipe.objects.all()
+    def get_queryset(self):
+        return self.get_recipes()
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
@@ -101,25 +86,79 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in (
             'doing_favorite', 'doing_shopping_cart', 'create',
+            'get_shopping_cart', 'feed',
         ):
             return (permissions.IsAuthenticated(), )
         if self.action in ('destroy', 'partial_update'):
             return (IsAuthorAuthenticated(), )
         return super().get_permissions()
 
+    @action(detail=False, methods=['GET'])
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые сверху.
+
+        Лента читается из FeedEntry по индексу (user, pub_date); рецепты
+        авторов с огромным числом подписчиков подмешиваются при чтении
+        из их диапазонов индекса (author, pub_date), без COUNT.
+        """
+        pulled_author_ids = get_pulled_author_ids(request.user)
+        if pulled_author_ids:
+            positions = self.paginator.paginate_positions(
+                lambda limit, before: get_feed_positions(
+                    request.user, pulled_author_ids, limit, before
+                ),
+                request
+            )
+            recipe_ids = [position.pk for position in positions]
+        else:
+            entries = self.paginate_queryset(FeedEntry.objects.filter(
+                user=request.user
+            ).only('id', 'pub_date', 'recipe_id'))
+            recipe_ids = [entry.recipe_id for entry in entries]
+        by_id = self.get_recipes().in_bulk(recipe_ids)
+        recipes = [
+            by_id[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in by_id
+        ]
+        serializer = self.get_serializer(recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         url_path='get-link',
         methods=['GET'],
     )
     def get_link(self, request, pk=None):
+        serializer = s.GetLinkSerializer(
+            instance=get_object_or_404(Recipe.objects.only('id'), pk=pk),
+            context={'request': request}
+        )
+        return Response(serializer.data)
 
-        if request.method in SAFE_METHODS:
-            serializer = s.GetLinkSerializer(
-                instance=self.get_object(),
-                context={'request': request}
+    def add_or_remove_recipe(self, request, pk, serializer_class):
+        if request.method == 'POST':
+            serializer = serializer_class(
+                data=request.data,
+                context={
+                    'request': request,
+                    'recipe': get_object_or_404(Recipe, pk=pk)
+                }
             )
-            return Response(serializer.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            bump_user_relations(request.user.pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        with transaction.atomic():
+            deleted, _ = serializer_class.model.objects.filter(
+                user=request.user, recipe_id=pk
+            ).delete()
+            if deleted:
+                change_recipe_counter(pk, serializer_class.counter_field, -1)
+        if deleted:
+            bump_user_relations(request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=pk)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
     @action(
@@ -128,33 +167,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['POST', 'DELETE'],
     )
     def doing_favorite(self, request, pk=None):
-
-        if request.method == 'POST':
-            serializer = s.FavoriteSerializer(
-                data=request.data,
-                context={'request': request, 'pk': pk}
-            )
-            serializer.is_valid(raise_exception=True)
-            Favorite.objects.create(
-                user=self.request.user,
-                recipe=Recipe.objects.get(pk=pk)
-            )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        if request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=pk)
-            try:
-
-                instance = Favorite.objects.get(
-                    user=self.request.user,
-                    recipe=recipe
-                )
-                instance.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except ObjectDoesNotExist:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        return self.add_or_remove_recipe(request, pk, s.FavoriteSerializer)
 
     @action(
         detail=True,
@@ -163,33 +176,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     )
     def doing_shopping_cart(self, request, pk=None):
-
-        if request.method == 'POST':
-            serializer = s.ShoppingSerializer(
-                data=request.data,
-                context={'request': request, 'pk': pk}
-            )
-            serializer.is_valid(raise_exception=True)
-            Shopping.objects.create(
-                user=self.request.user,
-                recipe=Recipe.objects.get(pk=pk)
-            )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        if request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=pk)
-            try:
-
-                instance = Shopping.objects.get(
-                    user=self.request.user,
-                    recipe=recipe
-                )
-                instance.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except ObjectDoesNotExist:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        return self.add_or_remove_recipe(request, pk, s.ShoppingSerializer)
 
     @action(
         detail=False,
@@ -197,31 +184,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['GET'],
     )
     def get_shopping_cart(self, request):
-
-        if request.method in SAFE_METHODS:
-            user_recipes_shopping_cart = [
-                obj_shoppig.recipe.recipes_ingredient.all()
-                for obj_shoppig in self.request.user.shoppings.all()
-            ]
-            shopping_cart = {}
-            for ingrediets_values in user_recipes_shopping_cart:
-                for ingredient_value in ingrediets_values:
-                    shopping_cart[
-                        ingredient_value.ingredient
-                    ] = shopping_cart.get(
-                        ingredient_value.ingredient, []
-                    ) + [ingredient_value.amount]
-            response = '\n'.join(
-                [
-                    f'{key.name}: {sum(value)} {key.measurement_unit}'
-                    for key, value in shopping_cart.items()
-                ]
+        file_format = request.query_params.get(
+            const.SHOPPING_CART_FORMAT_PARAM, const.SHOPPING_CART_FORMAT
+        )
+        if file_format not in SHOPPING_CART_RENDERERS:
+            return Response(
+                {
+                    const.SHOPPING_CART_FORMAT_PARAM: (
+                        'Доступные форматы: '
+                        f'{", ".join(SHOPPING_CART_RENDERERS)}'
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
-
-            filename = f"shopping_cart_{request.user.username}.txt"
-            content = response
-            response = HttpResponse(content, content_type='text/plain')
-            response[
-                'Content-Disposition'
-            ] = f'attachment; filename={filename}'
-            return response
+        renderer, content_type = SHOPPING_CART_RENDERERS[file_format]
+        rows = get_shopping_cart_totals(request.user).iterator()
+        if isinstance(request._request, ASGIRequest):
+            # Под ASGI потоковый ответ читается в event loop, где ORM
+            # недоступен, поэтому строки выбираются здесь, в потоке view.
+            rows = list(rows)
+        response = StreamingHttpResponse(
+            renderer(rows),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+        filename = f'shopping_cart_{request.user.username}.{file_format}'
+        response[
+            'Content-Disposition'
+        ] = f'attachment; filename={filename}'
+        return response
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке на страницу рецепта."""
+    recipe_id = decode_code(code)
+    if recipe_id is None or not recipe_link_cache.exists(recipe_id):
+        raise Http404('Ссылка не найдена.')
+    hit_counter.hit(recipe_id)
+    return redirect(f'/recipes/{recipe_id}')
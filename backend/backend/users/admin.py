@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
+from technol_parts_apps.pagination import EstimatedCountPaginator
+
 User = get_user_model()
 
 
@@ -17,3 +19,5 @@ class RecipeAdmin(admin.ModelAdmin):
         'username',
         'email'
     )
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
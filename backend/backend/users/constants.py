@@ -9,3 +9,4 @@ LAST_NAME_LENGTH = 150
 
 # NOT_BLANK_MESSAGE = 'Это поле не может быть пустым'
 # NOT_REQUIRED_MESSAGE = 'Это обязательное поле для заполнения'
+SUMMARY_CACHE_TIMEOUT = 60 * 60
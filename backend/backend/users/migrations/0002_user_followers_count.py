@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_followers_count(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('technol_parts_apps', 'Follow')
+    User.objects.update(followers_count=Coalesce(Subquery(
+        Follow.objects.filter(
+            following=OuterRef('pk')
+        ).order_by().values('following').annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('technol_parts_apps', '0023_recipe_thumbnails_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
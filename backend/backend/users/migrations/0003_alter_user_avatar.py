@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:44
+
+from django.db import migrations
+import technol_parts_apps.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=technol_parts_apps.fields.ProcessedImageField(blank=True, default=None, null=True, upload_to='users/'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 
 import users.constants as const
 import users.validators as vd
+from technol_parts_apps.fields import ProcessedImageField
 
 
 class User(AbstractUser):
@@ -31,12 +32,17 @@ class User(AbstractUser):
         max_length=const.PASSWORD_LENGTH,
         validators=[vd.validator_password]
     )
-    avatar = models.ImageField(
+    avatar = ProcessedImageField(
         upload_to='users/',
         blank=True,
         null=True,
         default=None
     )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -1,23 +1,11 @@
-import base64
-
 import djoser.serializers as djs
 from django.contrib.auth import authenticate, get_user_model
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from technol_parts_apps.models import Follow
-
-User = get_user_model()
+from technol_parts_apps.images import Base64ImageField
 
+from .summaries import get_author_summaries
 
-class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='image.' + ext)
-
-        return super().to_internal_value(data)
+User = get_user_model()
 
 
 class AddAvatarSerializer(serializers.ModelSerializer):
@@ -69,7 +57,9 @@ class RetrieveUserSerializer(djs.UserSerializer):
         )
 
     def to_representation(self, instance):
-        representation = super().to_representation(instance)
+        representation = get_author_summaries(
+            self.context.get('request')
+        ).represent(instance)
         representation['is_subscribed'] = False
         return representation
 
@@ -78,11 +68,7 @@ class RetrieveOtherUserSerializer(RetrieveUserSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        if self.context['request'].auth and representation.get('id'):
-            representation['is_subscribed'] = Follow.objects.filter(
-                user=self.context['request'].user,
-                following=get_object_or_404(
-                    User,
-                    pk=representation['id'])).exists()
-            return representation
+        representation['is_subscribed'] = get_author_summaries(
+            self.context.get('request')
+        ).is_subscribed(instance)
         return representation
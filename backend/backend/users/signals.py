@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .summaries import invalidate_summary
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_user_summary(sender, instance, **kwargs):
+    invalidate_summary(instance.pk)
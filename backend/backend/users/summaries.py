@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+
+import users.constants as const
+from technol_parts_apps.caching import is_cache_shared
+from technol_parts_apps.relations import get_user_relations
+
+SUMMARY_FIELDS = ('id', 'first_name', 'last_name', 'username', 'email')
+
+
+def summary_key(user_id):
+    return f'user-summary:{user_id}'
+
+
+def invalidate_summary(user_id):
+    cache.delete(summary_key(user_id))
+
+
+def use_summary_cache():
+    """Сводки кэшируются между запросами только в общем кэше: в локальном
+    сохранение пользователя сбросило бы сводку лишь в одном процессе."""
+    return settings.AUTHOR_SUMMARY_CACHE and is_cache_shared()
+
+
+def build_summary(user):
+    summary = {field: getattr(user, field) for field in SUMMARY_FIELDS}
+    summary['avatar'] = user.avatar.url if user.avatar else None
+    return summary
+
+
+class AuthorSummaries:
+    """Сводки пользователей в рамках одного запроса.
+
+    Каждый автор сериализуется один раз, сколько бы раз он ни встречался
+    на странице. При AUTHOR_SUMMARY_CACHE и общем кэше сводки ещё и
+    хранятся в кэше между запросами до сохранения пользователя.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.summaries = {}
+
+    def get_summary(self, user):
+        summary = self.summaries.get(user.pk)
+        if summary is not None:
+            return summary
+        use_cache = use_summary_cache()
+        if use_cache:
+            summary = cache.get(summary_key(user.pk))
+        if summary is None:
+            summary = build_summary(user)
+            if use_cache:
+                cache.set(
+                    summary_key(user.pk), summary, const.SUMMARY_CACHE_TIMEOUT
+                )
+        self.summaries[user.pk] = summary
+        return summary
+
+    def represent(self, user):
+        representation = dict(self.get_summary(user))
+        if representation['avatar'] and self.request is not None:
+            representation['avatar'] = self.request.build_absolute_uri(
+                representation['avatar']
+            )
+        return representation
+
+    def is_subscribed(self, user):
+        return user.pk in get_user_relations(self.request).following
+
+
+def get_author_summaries(request):
+    if request is None:
+        return AuthorSummaries(None)
+    summaries = getattr(request, 'author_summaries', None)
+    if summaries is None:
+        summaries = request.author_summaries = AuthorSummaries(request)
+    return summaries
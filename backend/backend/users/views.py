@@ -1,5 +1,5 @@
 import djoser.views
-from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status
 from rest_framework.decorators import action
@@ -7,8 +7,14 @@ from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from technol_parts_apps.models import Follow
-from technol_parts_apps.serializers import FollowSerializer
+from technol_parts_apps.instrumentation import (
+    InstrumentedViewMixin, instrument_serializer
+)
+from technol_parts_apps.models import Follow, Recipe
+from technol_parts_apps.relations import bump_user_relations
+from technol_parts_apps.serializers import (
+    FollowSerializer, parse_recipes_limit
+)
 from .serializers import AddAvatarSerializer, User
 
 
@@ -29,7 +35,7 @@ class AddAvatarView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserrsViwset(djoser.views.UserViewSet):
+class UserrsViwset(InstrumentedViewMixin, djoser.views.UserViewSet):
     pagination_class = LimitOffsetPagination
     lookup_field = 'pk'
 
@@ -57,38 +63,55 @@ class UserrsViwset(djoser.views.UserViewSet):
     )
     def doing_subscribe(self, request, pk=None):
 
-        def get_data_context_serializer():
-            return FollowSerializer(
+        if request.method == 'POST':
+            serializer = FollowSerializer(
                 data=request.data,
                 context={
                     'request': request,
-                    'pk': pk,
+                    'following': get_object_or_404(User, pk=pk),
                     'recipes_limit': self.request.query_params.get(
                         'recipes_limit'
                     )
                 }
             )
-
-        if request.method == 'POST':
-            serializer = get_data_context_serializer()
             serializer.is_valid(raise_exception=True)
-            Follow.objects.create(
-                user=self.request.user,
-                following=get_object_or_404(User, pk=pk)
-            )
+            serializer.save()
+            bump_user_relations(request.user.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if request.method == 'DELETE':
-            following = get_object_or_404(User, pk=pk)
-            try:
-                instance = Follow.objects.get(
-                    user=self.request.user,
-                    following=following
-                )
-                instance.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            except ObjectDoesNotExist:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
+        deleted, _ = Follow.objects.filter(
+            user=request.user, following_id=pk
+        ).delete()
+        if deleted:
+            bump_user_relations(request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, pk=pk)
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    def get_subscriptions(self, recipes_limit):
+        """Подписки с числом рецептов и первыми recipes_limit рецептами.
+
+        Ограничение рецептов выполняется в БД коррелированным
+        подзапросом с LIMIT для каждого автора. annotate с Count
+        отключает Meta.ordering, поэтому порядок для пагинации задан явно.
+        """
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'thumbnails_source',
+            'author_id'
+        )
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        return User.objects.filter(
+            followings__user=self.request.user
+        ).annotate(
+            recipes_count=Count('recipes', distinct=True)
+        ).order_by('username', 'id').prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
 
     @action(
         detail=False,
@@ -97,22 +120,20 @@ class UserrsViwset(djoser.views.UserViewSet):
         pagination_class=LimitOffsetPagination
     )
     def list_subscribe(self, request):
-        subscriptions = User.objects.filter(id__in=[
-            item.following.id for item in request.user.follower.all()
-        ])
-        if self.paginator is not None:
-            page = self.paginate_queryset(subscriptions)
-            serializer = FollowSerializer(
-                page,
-                many=True,
-                context={
-                    'request': request,
-                    'recipes_limit': self.request.query_params.get(
-                        'recipes_limit'
-                    )
-                },
-
+        context = {
+            'request': request,
+            'recipes_limit': self.request.query_params.get('recipes_limit')
+        }
+        subscriptions = self.get_subscriptions(
+            parse_recipes_limit(context['recipes_limit'])
+        )
+        page = self.paginate_queryset(subscriptions)
+        if page is not None:
+            serializer = instrument_serializer(
+                request, FollowSerializer(page, many=True, context=context)
             )
             return self.get_paginated_response(serializer.data)
-        serializer = FollowSerializer(subscriptions, many=True)
+        serializer = FollowSerializer(
+            subscriptions, many=True, context=context
+        )
         return Response(serializer.data)